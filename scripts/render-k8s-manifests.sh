@@ -13,6 +13,7 @@ TARGET_SUBSCRIPTION_ID="6a539906-6ce2-4e3b-84ee-89f701de18d8"
 : "${AZURE_OPENAI_API_VERSION:=2024-10-21}"
 : "${AZURE_OPENAI_DEPLOYMENT_NAME:=gpt-5-nano}"
 : "${AZURE_OPENAI_WORKER_DEPLOYMENT_NAME:=${AZURE_OPENAI_DEPLOYMENT_NAME}}"
+: "${AZURE_OPENAI_ROUTER_DEPLOYMENT_NAME:=${AZURE_OPENAI_WORKER_DEPLOYMENT_NAME}}"
 : "${AZURE_OPENAI_ORCHESTRATOR_DEPLOYMENT_NAME:=gpt-5-nano}"
 : "${AZURE_OPENAI_REASONING_DEPLOYMENT_NAME:=gpt-5-mini}"
 : "${AZURE_REASONING_OPENAI_API_VERSION:=v1}"
@@ -86,7 +87,7 @@ TARGET_SUBSCRIPTION_ID="6a539906-6ce2-4e3b-84ee-89f701de18d8"
 export AZURE_CONTAINER_REGISTRY IMAGE_NAME IMAGE_TAG
 export AZURE_OPENAI_ENDPOINT AZURE_OPENAI_API_VERSION AZURE_OPENAI_DEPLOYMENT_NAME
 export AZURE_OPENAI_WORKER_DEPLOYMENT_NAME AZURE_OPENAI_ORCHESTRATOR_DEPLOYMENT_NAME
-export AZURE_OPENAI_REASONING_DEPLOYMENT_NAME
+export AZURE_OPENAI_REASONING_DEPLOYMENT_NAME AZURE_OPENAI_ROUTER_DEPLOYMENT_NAME
 export AZURE_REASONING_OPENAI_API_VERSION AZURE_OPENAI_PROJECT_ENDPOINT AZURE_FOUNDRY_PROJECT_ENDPOINT FOUNDRY_AISERVICES_ENDPOINT
 export AZURE_TEXT_EMBEDDING_DEPLOYMENT_NAME
 export AZURE_OPENAI_TIMEOUT_SECONDS AZURE_OPENAI_MAX_RETRIES
@@ -11,7 +11,7 @@ from __future__ import annotations
 import logging
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import json
@@ -36,7 +36,14 @@ from retrieval_plan import (
 from schema_provider import SchemaProvider
 from unified_retriever import Citation, UnifiedRetriever
 from opentelemetry import trace as _otel_trace
-from shared_utils import utc_now as _utc_now, env_bool as _env_bool, env_int as _env_int, canon_tool as _canon_tool
+from shared_utils import (
+    build_rows_preview,
+    canon_tool as _canon_tool,
+    env_bool as _env_bool,
+    env_int as _env_int,
+    safe_preview_value,
+    utc_now as _utc_now,
+)
 
 _cp_tracer = _otel_trace.get_tracer("aviation-rag-backend", "0.1.0")
 
@@ -625,24 +632,27 @@ class AviationRagContextProvider:
         sql_hint: Optional[str],
         on_trace: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]], List[Citation], Optional[str]]:
-        steps = sorted(plan.steps, key=lambda s: s.priority)
+        steps = plan.steps
         source_results: Dict[str, List[Dict[str, Any]]] = {}
         source_traces: List[Dict[str, Any]] = []
         citations: List[Citation] = []
         sql_query: Optional[str] = None
         step_outputs: Dict[int, tuple[str, List[Dict[str, Any]], List[Citation], Optional[str]]] = {}
 
-        # Pre-compute shared embedding once for all VECTOR steps.
+        # Compute the shared embedding for all VECTOR steps once, alongside the
+        # non-vector sources instead of ahead of them; only VECTOR steps wait.
         has_vector_steps = any(s.source.startswith("VECTOR_") for s in steps)
-        shared_embedding = None
-        if has_vector_steps:
+        embedding_future: Optional[Future] = None
+
+        def _shared_embedding() -> Optional[List[float]]:
             _t0_emb = time.perf_counter()
             try:
-                shared_embedding = self.retriever.get_embedding(query)
-                logger.info("perf stage=%s ms=%.1f", "shared_embedding_legacy", (time.perf_counter() - _t0_emb) * 1000)
+                embedding = self.retriever.get_embedding(query)
             except Exception as exc:
-                shared_embedding = None
                 logger.warning("Shared embedding precompute failed in legacy path; continuing: %s", exc)
+                return None
+            logger.info("perf stage=%s ms=%.1f", "shared_embedding_legacy", (time.perf_counter() - _t0_emb) * 1000)
+            return embedding
 
         def _run(step: SourcePlan) -> tuple[str, List[Dict[str, Any]], List[Citation], Optional[str]]:
             params = dict(step.params)
@@ -651,8 +661,10 @@ class AviationRagContextProvider:
             if step.source.startswith("VECTOR_"):
                 if "top" not in params:
                     params["top"] = self.semantic_top_k
-                if shared_embedding is not None and "embedding" not in params:
-                    params["embedding"] = shared_embedding
+                if embedding_future is not None and "embedding" not in params:
+                    shared_embedding = embedding_future.result()
+                    if shared_embedding is not None:
+                        params["embedding"] = shared_embedding
             rows, row_citations, out_sql = self.retriever.retrieve_source(step.source, query, params)
             return step.source, rows, row_citations, out_sql
 
@@ -660,7 +672,10 @@ class AviationRagContextProvider:
         start_times: Dict[Any, float] = {}
         step_event_ids: Dict[int, str] = {}
 
-        with ThreadPoolExecutor(max_workers=max(1, min(6, len(steps)))) as executor:
+        with ThreadPoolExecutor(max_workers=max(1, min(6, len(steps))) + int(has_vector_steps)) as executor:
+            # Submitted first so no VECTOR step can occupy a worker ahead of it.
+            if has_vector_steps:
+                embedding_future = executor.submit(_shared_embedding)
             future_map = {}
             for idx, step in enumerate(steps):
                 step_event_ids[idx] = str(uuid.uuid4())
@@ -783,59 +798,10 @@ class AviationRagContextProvider:
         max_columns: int = 8,
         max_chars: int = 180,
     ) -> tuple[List[str], List[Dict[str, Any]], bool]:
-        if not rows:
-            return [], [], False
-
-        hidden_keys = {"content_vector", "partial_schema", "fallback_sql"}
-        columns: List[str] = []
-        for row in rows:
-            if not isinstance(row, dict):
-                continue
-            for key in row.keys():
-                if not isinstance(key, str) or key.startswith("__") or key in hidden_keys:
-                    continue
-                if key not in columns:
-                    columns.append(key)
-                    if len(columns) >= max_columns:
-                        break
-            if len(columns) >= max_columns:
-                break
-
-        preview: List[Dict[str, Any]] = []
-        for row in rows[:max_rows]:
-            if not isinstance(row, dict):
-                continue
-            item: Dict[str, Any] = {}
-            for column in columns:
-                if column in row:
-                    item[column] = self._safe_preview_value(row[column], max_chars=max_chars)
-            if item:
-                preview.append(item)
-
-        return columns, preview, len(rows) > len(preview)
+        return build_rows_preview(rows, max_rows, max_columns, max_chars)
 
     def _safe_preview_value(self, value: Any, max_chars: int = 180) -> Any:
-        if value is None or isinstance(value, (int, float, bool)):
-            return value
-
-        if isinstance(value, str):
-            return value if len(value) <= max_chars else value[: max_chars - 3] + "..."
-
-        if hasattr(value, "isoformat"):
-            try:
-                return value.isoformat()
-            except Exception:
-                pass
-
-        if isinstance(value, (dict, list, tuple)):
-            try:
-                serialized = json.dumps(value, ensure_ascii=True)
-            except Exception:
-                serialized = str(value)
-            return serialized if len(serialized) <= max_chars else serialized[: max_chars - 3] + "..."
-
-        rendered = str(value)
-        return rendered if len(rendered) <= max_chars else rendered[: max_chars - 3] + "..."
+        return safe_preview_value(value, max_chars)
 
     def _first_row_error(self, rows: List[Dict[str, Any]]) -> tuple[Optional[str], Optional[str]]:
         for row in rows:
@@ -961,7 +927,7 @@ class AviationRagContextProvider:
         sections.append(f"Retrieval profile: {retrieval_plan.profile}")
         sections.append(
             "Planned sources: "
-            + ", ".join(f"{s.source}(p{s.priority})" for s in sorted(retrieval_plan.steps, key=lambda x: x.priority))
+            + ", ".join(f"{s.source}(p{s.priority})" for s in retrieval_plan.steps)
         )
 
         if sql_query:
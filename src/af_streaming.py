@@ -5,10 +5,11 @@ Helpers for SSE framing with Agent Framework-style events.
 
 from __future__ import annotations
 
-import json
 from typing import Any, Dict
 
+from shared_utils import json_dumps
+
 
 def to_sse(event: Dict[str, Any]) -> str:
     """Encode one event as Server-Sent Events frame."""
-    return f"data: {json.dumps(event, ensure_ascii=True)}\n\n"
+    return f"data: {json_dumps(event)}\n\n"
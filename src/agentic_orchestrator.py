@@ -5,7 +5,6 @@ LLM orchestrator for code-rag agentic planning.
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 import re
@@ -21,29 +20,14 @@ from shared_utils import (
     ENGLISH_4LETTER_BLOCKLIST as _ENGLISH_4LETTER_BLOCKLIST,
     OPS_TABLE_SIGNALS,
     FABRIC_SQL_DELAY_TRIGGERS,
+    json_dumps,
+    json_loads,
     supports_explicit_temperature as _supports_explicit_temperature,
+    supports_reasoning_effort as _supports_reasoning_effort,
     matches_any,
 )
 
 
-def _init_client():
-    client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
-    return client
-
-
-def _supports_reasoning_effort(model_name: str) -> bool:
-    model = (model_name or "").strip().lower()
-    normalized = model.replace("-", "").replace("_", "")
-    return (
-        model.startswith("gpt-5")
-        or normalized.startswith("gpt5")
-        or "gpt5" in normalized
-        or model.startswith("o1")
-        or model.startswith("o3")
-        or model.startswith("o4")
-    )
-
-
 ROUTER_PROMPT = """You are ROUTER_LLM for an aviation Pilot Brief demo.
 Output deterministic execution plan as JSON only.
 
@@ -94,7 +78,7 @@ Plan schema:
 
 class AgenticOrchestrator:
     def __init__(self):
-        self.client = _init_client()
+        self.client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
         self.model = (
             (os.getenv("AZURE_OPENAI_ORCHESTRATOR_DEPLOYMENT_NAME", "") or "").strip()
             or (os.getenv("AZURE_OPENAI_REASONING_DEPLOYMENT_NAME", "") or "").strip()
@@ -133,7 +117,7 @@ class AgenticOrchestrator:
                 "response_format": {"type": "json_object"},
                 "messages": [
                     {"role": "system", "content": ROUTER_PROMPT},
-                    {"role": "user", "content": json.dumps(payload, ensure_ascii=True)},
+                    {"role": "user", "content": json_dumps(payload)},
                 ],
             }
             if _supports_explicit_temperature(self.model):
@@ -143,7 +127,7 @@ class AgenticOrchestrator:
 
             response = self.client.chat.completions.create(**request_kwargs)
             raw = response.choices[0].message.content or "{}"
-            parsed = json.loads(raw)
+            parsed = json_loads(raw)
             plan = AgenticPlan.from_dict(parsed)
             if not plan.tool_calls:
                 return self._fallback_plan(user_query, runtime_context, intent_graph, required_sources or [])
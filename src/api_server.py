@@ -306,7 +306,8 @@ def fabric_preflight():
     """Fabric integration preflight checks for live demo readiness."""
     try:
         af_runtime = get_runtime()
-        payload = af_runtime.retriever.fabric_preflight()
+        refresh = str(request.args.get("refresh", "") or "").strip().lower() in {"1", "true", "yes"}
+        payload = af_runtime.retriever.fabric_preflight(refresh=refresh)
         return jsonify(payload)
     except Exception as exc:
         logger.exception("Fabric preflight error")
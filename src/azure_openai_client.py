@@ -3,29 +3,87 @@
 
 from __future__ import annotations
 
+import importlib.util
 import logging
 import os
 import threading
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-from azure.identity import AzureCliCredential, DefaultAzureCredential, get_bearer_token_provider
-from openai import AzureOpenAI
+from shared_utils import DEFAULT_OPENAI_API_VERSION
+
+# openai / azure.identity / httpx take over a second to import, so they are
+# loaded on first client construction; heuristic-only paths never pay for them.
+if TYPE_CHECKING:
+    from azure.identity import DefaultAzureCredential
+    from openai import AzureOpenAI, DefaultHttpxClient
 
 logger = logging.getLogger(__name__)
 
 AZURE_OPENAI_SCOPE = "https://cognitiveservices.azure.com/.default"
 
 
-def client_tuning_kwargs() -> Dict[str, float | int]:
+def client_tuning_kwargs() -> Dict[str, Any]:
+    """Timeout and retry kwargs for the ``AzureOpenAI`` constructor.
+
+    The overall timeout bounds reads (completions can legitimately take tens
+    of seconds), while connecting and waiting for a pooled connection get a
+    much shorter budget so an unreachable endpoint or an exhausted pool fails
+    fast into the SDK's retry instead of holding a worker for the full read
+    timeout.
+    """
     try:
         timeout_seconds = float(os.getenv("AZURE_OPENAI_TIMEOUT_SECONDS", "45"))
     except Exception:
         timeout_seconds = 45.0
+    try:
+        connect_seconds = max(0.1, float(os.getenv("AZURE_OPENAI_CONNECT_TIMEOUT_SECONDS", "5")))
+    except Exception:
+        connect_seconds = 5.0
     try:
         max_retries = max(0, int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "1")))
     except Exception:
         max_retries = 1
-    return {"timeout": timeout_seconds, "max_retries": max_retries}
+
+    import httpx
+
+    connect_seconds = min(connect_seconds, timeout_seconds)
+    timeout = httpx.Timeout(timeout_seconds, connect=connect_seconds, pool=connect_seconds)
+    return {"timeout": timeout, "max_retries": max_retries}
+
+
+def _http_client() -> DefaultHttpxClient:
+    """HTTP client with a connection pool sized for the parallel plan workers.
+
+    The shared client serves routing, writers, embeddings and synthesis at
+    once; httpx's default pool (10 keep-alive) makes concurrent calls queue
+    for sockets and re-handshake TLS.  HTTP/2 (when ``h2`` is installed)
+    multiplexes those calls over a few long-lived connections.
+    """
+    try:
+        max_connections = max(1, int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100")))
+    except Exception:
+        max_connections = 100
+    try:
+        max_keepalive = max(1, int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50")))
+    except Exception:
+        max_keepalive = 50
+    try:
+        keepalive_expiry = max(0.0, float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY_SECONDS", "60")))
+    except Exception:
+        keepalive_expiry = 60.0
+    http2_enabled = (os.getenv("AZURE_OPENAI_HTTP2", "true") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+    import httpx
+    from openai import DefaultHttpxClient
+
+    return DefaultHttpxClient(
+        http2=http2_enabled and importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_keepalive, max_connections),
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
 
 
 def _auth_mode() -> str:
@@ -33,6 +91,8 @@ def _auth_mode() -> str:
 
 
 def _build_credential():
+    from azure.identity import AzureCliCredential, DefaultAzureCredential
+
     aoai_tenant = os.getenv("AZURE_OPENAI_TENANT_ID", "").strip()
     managed_identity_client_id = os.getenv("AZURE_OPENAI_MANAGED_IDENTITY_CLIENT_ID", "").strip() or None
 
@@ -47,21 +107,28 @@ def _build_credential():
 
 
 def _token_client(endpoint: str, api_version: str, credential: Optional[DefaultAzureCredential] = None) -> AzureOpenAI:
+    from azure.identity import get_bearer_token_provider
+    from openai import AzureOpenAI
+
     cred = credential or _build_credential()
     token_provider = get_bearer_token_provider(cred, AZURE_OPENAI_SCOPE)
     return AzureOpenAI(
         azure_endpoint=endpoint,
         azure_ad_token_provider=token_provider,
         api_version=api_version,
+        http_client=_http_client(),
         **client_tuning_kwargs(),
     )
 
 
 def _api_key_client(endpoint: str, api_version: str, api_key: str) -> AzureOpenAI:
+    from openai import AzureOpenAI
+
     return AzureOpenAI(
         azure_endpoint=endpoint,
         api_key=api_key,
         api_version=api_version,
+        http_client=_http_client(),
         **client_tuning_kwargs(),
     )
 
@@ -82,7 +149,9 @@ def init_azure_openai_client(
     resolved_endpoint = (endpoint or os.getenv("AZURE_OPENAI_ENDPOINT", "")).strip()
     if not resolved_endpoint:
         raise ValueError("Missing AZURE_OPENAI_ENDPOINT")
-    resolved_api_version = (api_version or os.getenv("AZURE_OPENAI_API_VERSION", "2024-06-01")).strip() or "2024-06-01"
+    resolved_api_version = (
+        api_version or os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_OPENAI_API_VERSION)
+    ).strip() or DEFAULT_OPENAI_API_VERSION
     api_key = os.getenv("AZURE_OPENAI_API_KEY", "").strip()
     mode = _auth_mode()
 
@@ -6,14 +6,16 @@ Executes agentic plans against registered datastores/tools.
 from __future__ import annotations
 
 import logging
+import threading
+from collections import defaultdict
 import time
 import hashlib
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import json
 import re
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +34,44 @@ from shared_utils import (
 )
 
 
-@dataclass
+# source -> ordered (keyword, evidence_type) rules matched against "CALL_ID:OPERATION".
+_EVIDENCE_RULES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "KQL": (("METAR", "METAR"), ("TAF", "TAF"), ("HAZARD", "Hazards")),
+    "NOSQL": (("NOTAM", "NOTAM"),),
+    "SQL": (("RUNWAY", "RunwayConstraints"), ("CONSTRAINT", "RunwayConstraints")),
+    "VECTOR_REG": (("SOP", "SOPClause"), ("POLICY", "SOPClause")),
+}
+
+
+# Writers hold no per-request state, so one instance per process is shared by
+# every PlanExecutor (mirrors get_shared_client in azure_openai_client).
+_shared_sql_writer: Optional[SQLWriter] = None
+_shared_kql_writer: Optional[KQLWriter] = None
+_writer_lock = threading.Lock()
+
+# Background pool for the shared query embedding so it overlaps the first wave.
+_embedding_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="plan-embedding")
+
+
+def get_shared_sql_writer() -> SQLWriter:
+    global _shared_sql_writer
+    if _shared_sql_writer is None:
+        with _writer_lock:
+            if _shared_sql_writer is None:
+                _shared_sql_writer = SQLWriter()
+    return _shared_sql_writer
+
+
+def get_shared_kql_writer() -> KQLWriter:
+    global _shared_kql_writer
+    if _shared_kql_writer is None:
+        with _writer_lock:
+            if _shared_kql_writer is None:
+                _shared_kql_writer = KQLWriter()
+    return _shared_kql_writer
+
+
+@dataclass(slots=True)
 class PlanExecutionResult:
     source_results: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
     source_results_by_call: Dict[str, "CallResult"] = field(default_factory=dict)
@@ -43,7 +82,7 @@ class PlanExecutionResult:
     warnings: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class CallResult:
     call_id: str
     source: str
@@ -60,8 +99,14 @@ class CallResult:
 class PlanExecutor:
     _TYPE_MISMATCH_PATTERNS = ("operator does not exist", "cannot cast type", "invalid input syntax")
 
-    def __init__(self, retriever: UnifiedRetriever):
+    def __init__(self, retriever: UnifiedRetriever, emit_previews: bool = True):
         self.retriever = retriever
+        # Row previews only feed the UI trace stream; callers that discard
+        # traces can skip building them on the success path.
+        self.emit_previews = emit_previews
+        self._shared_embedding_future: Optional[Future] = None
+        self._shared_embedding_query: str = ""
+        # Optional per-executor overrides; the process-wide writers are used otherwise.
         self.sql_writer: Optional[SQLWriter] = None
         self.kql_writer: Optional[KQLWriter] = None
 
@@ -74,21 +119,8 @@ class PlanExecutor:
     ) -> PlanExecutionResult:
         result = PlanExecutionResult()
 
-        # Pre-compute shared embedding for VECTOR tool calls using the same query.
-        has_vector_calls = any(
-            self._canon_tool(call.tool).startswith("VECTOR_") for call in plan.tool_calls
-        )
-        self._shared_embedding = None
+        self._shared_embedding_future = None
         self._shared_embedding_query = user_query
-        if has_vector_calls:
-            _t0_emb = time.perf_counter()
-            try:
-                self._shared_embedding = self.retriever.get_embedding(user_query)
-                logger.info("perf stage=%s ms=%.1f", "shared_embedding_agentic", (time.perf_counter() - _t0_emb) * 1000)
-            except Exception as exc:
-                self._shared_embedding = None
-                result.warnings.append(f"shared_embedding_failed:{exc}")
-                logger.warning("Shared embedding precompute failed; continuing: %s", exc)
 
         # Build evidence -> tool map for post-verification.
         for req in plan.required_evidence:
@@ -97,13 +129,56 @@ class PlanExecutor:
                 if cov.evidence == req.name:
                     via = list(cov.via_tools)
                     break
-            result.evidence_tool_map[req.name] = [self._canon_tool(t) for t in via if self._canon_tool(t)]
+            result.evidence_tool_map[req.name] = [src for t in via if (src := canon_tool(t))]
+
+        # Tool-less plans need no scheduling, worker pool, or embedding.
+        if not plan.tool_calls:
+            return result
+
+        # Pre-compute shared embedding for VECTOR tool calls using the same query.
+        # It runs in the background so non-vector calls in the first wave are not
+        # held up; vector calls wait on the future when they need it.
+        has_vector_calls = any(
+            canon_tool(call.tool).startswith("VECTOR_") for call in plan.tool_calls
+        )
+        if has_vector_calls:
+            self._shared_embedding_future = _embedding_pool.submit(self._compute_shared_embedding, user_query)
+
+        # The source-identifying trace fields are invariant for the lifetime of
+        # one execute(); build them once per source and splat them into every
+        # start/done/error trace instead of re-querying the retriever.
+        trace_headers: Dict[str, Dict[str, Any]] = {}
+
+        def _trace_header(source: str) -> Dict[str, Any]:
+            header = trace_headers.get(source)
+            if header is None:
+                header = {
+                    "source": source,
+                    "planned_source": source,
+                    "executed_source": source,
+                    "source_meta": self.retriever.source_event_meta(source),
+                    "execution_mode": self.retriever.source_mode(source),
+                }
+                trace_headers[source] = header
+            return header
 
         pending: Dict[str, ToolCall] = {call.id: call for call in plan.tool_calls}
-        done_ids: set[str] = set()
+        # Kahn-style scheduling: count unmet dependencies and index dependents
+        # once, then release calls as their dependencies complete instead of
+        # rescanning every pending call on each wave.
+        plan_order = {call_id: idx for idx, call_id in enumerate(pending)}
+        unmet_deps: Dict[str, int] = {}
+        dependents: Dict[str, List[str]] = defaultdict(list)
+        for call in pending.values():
+            deps = set(call.depends_on or [])
+            unmet_deps[call.id] = len(deps)
+            for dep in deps:
+                dependents[dep].append(call.id)
+        ready_ids = [call_id for call_id, count in unmet_deps.items() if count == 0]
 
         while pending:
-            ready = [call for call in pending.values() if all(dep in done_ids for dep in call.depends_on)]
+            ready = [pending[call_id] for call_id in sorted(ready_ids, key=plan_order.__getitem__)]
+            ready_ids = []
             if not ready:
                 # Break dependency deadlocks safely for demo execution.
                 ready = [next(iter(pending.values()))]
@@ -113,18 +188,14 @@ class PlanExecutor:
             with ThreadPoolExecutor(max_workers=max(1, min(4, len(ready)))) as pool:
                 future_map = {}
                 for call in ready:
-                    source = self._canon_tool(call.tool)
+                    source = canon_tool(call.tool)
                     started_at = _utc_now()
                     started_at_map[call.id] = started_at
                     trace_start = {
                         "type": "source_call_start",
-                        "source": source,
-                        "planned_source": source,
-                        "executed_source": source,
+                        **_trace_header(source),
                         "reason": call.operation,
                         "priority": 0,
-                        "source_meta": self.retriever.source_event_meta(source),
-                        "execution_mode": self.retriever.source_mode(source),
                         "contract_status": "planned",
                         "event_id": call.id,
                         "timestamp": started_at,
@@ -136,16 +207,22 @@ class PlanExecutor:
 
                 for future in as_completed(future_map):
                     call = future_map[future]
-                    source = self._canon_tool(call.tool)
+                    source = canon_tool(call.tool)
                     completed_at = _utc_now()
+                    # _run_call may rebind call.params, so read it only after the
+                    # future resolves; the call result shares that dict as-is.
                     try:
                         rows, citations, sql_query = future.result()
-                        rows = self._annotate_rows(rows, source, call.id, call.operation, call.params, completed_at)
+                        params = call.params or {}
+                        rows = self._annotate_rows(rows, source, call.id, call.operation, params, completed_at)
                         if source == "GRAPH" and call.operation == "entity_expansion":
                             self._enrich_entities_from_graph(plan, rows)
                         has_row_errors = self._rows_have_errors(rows)
                         error_code, error_detail = self._first_row_error(rows)
-                        columns, rows_preview, rows_truncated = self._build_rows_preview(rows)
+                        if self.emit_previews:
+                            columns, rows_preview, rows_truncated = self._build_rows_preview(rows)
+                        else:
+                            columns, rows_preview, rows_truncated = [], [], False
                         result.source_results_by_call[call.id] = CallResult(
                             call_id=call.id,
                             source=source,
@@ -156,24 +233,19 @@ class PlanExecutor:
                             error=None,
                             started_at=started_at_map.get(call.id, ""),
                             completed_at=completed_at,
-                            params=dict(call.params or {}),
+                            params=params,
                         )
                         if sql_query:
                             result.sql_queries[call.id] = sql_query
-                        execution_mode = self.retriever.source_mode(source)
                         if has_row_errors:
                             contract_status = "failed"
                         else:
                             contract_status = "met"
                         trace_done = {
                             "type": "source_call_done",
-                            "source": source,
-                            "planned_source": source,
-                            "executed_source": source,
+                            **_trace_header(source),
                             "row_count": len(rows),
                             "citation_count": len(citations),
-                            "source_meta": self.retriever.source_event_meta(source),
-                            "execution_mode": execution_mode,
                             "contract_status": contract_status,
                             "event_id": call.id,
                             "timestamp": completed_at,
@@ -191,7 +263,7 @@ class PlanExecutor:
                             )
                             trace_done["query_rewritten"] = rewritten
                             trace_done["rewrite_reason"] = (
-                                str((call.params or {}).get("__runtime_rewrite_reason", ""))
+                                str(params.get("__runtime_rewrite_reason", ""))
                                 if rewritten
                                 else ""
                             )
@@ -205,12 +277,13 @@ class PlanExecutor:
                         if on_trace:
                             on_trace(trace_done)
                     except Exception as exc:
+                        params = call.params or {}
                         error_rows = self._annotate_rows(
                             [{"error": str(exc)}],
                             source,
                             call.id,
                             call.operation,
-                            call.params,
+                            params,
                             completed_at,
                         )
                         result.source_results_by_call[call.id] = CallResult(
@@ -223,19 +296,15 @@ class PlanExecutor:
                             error=str(exc),
                             started_at=started_at_map.get(call.id, ""),
                             completed_at=completed_at,
-                            params=dict(call.params or {}),
+                            params=params,
                         )
                         columns, rows_preview, rows_truncated = self._build_rows_preview(error_rows)
                         trace_err = {
                             "type": "source_call_done",
-                            "source": source,
-                            "planned_source": source,
-                            "executed_source": source,
+                            **_trace_header(source),
                             "row_count": 1,
                             "citation_count": 0,
                             "error": str(exc),
-                            "source_meta": self.retriever.source_event_meta(source),
-                            "execution_mode": self.retriever.source_mode(source),
                             "contract_status": "failed",
                             "event_id": call.id,
                             "timestamp": completed_at,
@@ -247,11 +316,23 @@ class PlanExecutor:
                         result.source_traces.append(trace_err)
                         if on_trace:
                             on_trace(trace_err)
-                    done_ids.add(call.id)
                     pending.pop(call.id, None)
-
-        result.source_results = self._flatten_source_results(result.source_results_by_call, plan.tool_calls)
-        result.citations = self._flatten_citations(result.source_results_by_call, plan.tool_calls)
+                    for dependent_id in dependents.get(call.id, ()):
+                        unmet_deps[dependent_id] -= 1
+                        if unmet_deps[dependent_id] == 0 and dependent_id in pending:
+                            ready_ids.append(dependent_id)
+
+        embedding_future = self._shared_embedding_future
+        if embedding_future is not None:
+            if not embedding_future.done():
+                # No vector call consumed it; don't keep an unneeded request queued.
+                embedding_future.cancel()
+            elif not embedding_future.cancelled() and embedding_future.exception() is not None:
+                result.warnings.append(f"shared_embedding_failed:{embedding_future.exception()}")
+
+        result.source_results, result.citations = self._flatten_results(
+            result.source_results_by_call, plan.tool_calls
+        )
         return result
 
     _MAX_ENTITIES_PER_KEY = 50
@@ -286,7 +367,7 @@ class PlanExecutor:
         plan: AgenticPlan,
         schemas: Dict[str, Any],
     ) -> Tuple[List[Dict[str, Any]], List[Citation], Optional[str]]:
-        source = self._canon_tool(call.tool)
+        source = canon_tool(call.tool)
         if not source:
             return [{"error": f"unknown_tool:{call.tool}"}], [], None
         evidence_type = str(call.params.get("evidence_type", "")).strip()
@@ -537,11 +618,8 @@ class PlanExecutor:
             # Reuse shared embedding when the query text matches the original user query.
             effective_query = call_query
             shared_emb = None
-            if (
-                self._shared_embedding is not None
-                and effective_query == self._shared_embedding_query
-            ):
-                shared_emb = self._shared_embedding
+            if effective_query == self._shared_embedding_query:
+                shared_emb = self._await_shared_embedding()
             rows, citations = self.retriever.query_semantic(
                 effective_query,
                 top=int(call.params.get("top", 5)),
@@ -553,6 +631,25 @@ class PlanExecutor:
 
         return [{"error": f"unknown_tool:{source}"}], [], None
 
+    def _compute_shared_embedding(self, user_query: str) -> Any:
+        _t0_emb = time.perf_counter()
+        try:
+            embedding = self.retriever.get_embedding(user_query)
+        except Exception as exc:
+            logger.warning("Shared embedding precompute failed; continuing: %s", exc)
+            raise
+        logger.info("perf stage=%s ms=%.1f", "shared_embedding_agentic", (time.perf_counter() - _t0_emb) * 1000)
+        return embedding
+
+    def _await_shared_embedding(self) -> Any:
+        future = self._shared_embedding_future
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
     def _execute_sql_raw(self, sql_query: str) -> Tuple[List[Dict[str, Any]], List[Citation]]:
         return self.retriever.execute_sql_query(sql_query)
 
@@ -577,9 +674,6 @@ class PlanExecutor:
 
         return [{"error": sql_query, "error_code": "sql_schema_missing"}], [], sql_query
 
-    def _canon_tool(self, raw: str) -> str:
-        return canon_tool(raw)
-
     def _looks_like_sql(self, text: str) -> bool:
         return bool(re.match(r"^\s*(SELECT|WITH)\b", text, re.IGNORECASE))
 
@@ -589,14 +683,10 @@ class PlanExecutor:
         return "|" in stripped or lowered.startswith("let ") or lowered.startswith(".show")
 
     def _get_sql_writer(self) -> SQLWriter:
-        if self.sql_writer is None:
-            self.sql_writer = SQLWriter()
-        return self.sql_writer
+        return self.sql_writer or get_shared_sql_writer()
 
     def _get_kql_writer(self) -> KQLWriter:
-        if self.kql_writer is None:
-            self.kql_writer = KQLWriter()
-        return self.kql_writer
+        return self.kql_writer or get_shared_kql_writer()
 
     def _coerce_query_text(self, value: Any, user_query: str, source: str, call: ToolCall) -> str:
         if isinstance(value, str):
@@ -630,69 +720,53 @@ class PlanExecutor:
         params: Dict[str, Any],
         completed_at: str,
     ) -> List[Dict[str, Any]]:
-        out: List[Dict[str, Any]] = []
-        evidence_type = str((params or {}).get("evidence_type", "")).strip()
+        # Rows are freshly built per call by the retriever, so annotate them in
+        # place instead of copying every row dict.
+        evidence_type = str(params.get("evidence_type", "")).strip()
         if not evidence_type:
             evidence_type = self._infer_evidence_type(source, call_id, operation)
+        meta: Dict[str, Any] = {
+            "__source": source,
+            "__call_id": call_id,
+            "__operation": operation,
+            "__fetched_at": completed_at,
+        }
+        if evidence_type:
+            meta["__evidence_type"] = evidence_type
+        out: List[Dict[str, Any]] = []
         for row in rows:
             if not isinstance(row, dict):
                 continue
-            enriched = dict(row)
-            enriched["__source"] = source
-            enriched["__call_id"] = call_id
-            enriched["__operation"] = operation
-            enriched["__fetched_at"] = completed_at
-            if evidence_type:
-                enriched["__evidence_type"] = evidence_type
-            out.append(enriched)
+            row.update(meta)
+            out.append(row)
         return out
 
     def _infer_evidence_type(self, source: str, call_id: str, operation: str) -> str:
-        source_u = (source or "").upper()
-        call_u = (call_id or "").upper()
-        op_u = (operation or "").upper()
-        token = f"{call_u}:{op_u}"
-
-        if source_u == "KQL":
-            if "METAR" in token:
-                return "METAR"
-            if "TAF" in token:
-                return "TAF"
-            if "HAZARD" in token:
-                return "Hazards"
-        if source_u == "NOSQL" and "NOTAM" in token:
-            return "NOTAM"
-        if source_u == "SQL" and ("RUNWAY" in token or "CONSTRAINT" in token):
-            return "RunwayConstraints"
-        if source_u == "VECTOR_REG" and ("SOP" in token or "POLICY" in token):
-            return "SOPClause"
+        rules = _EVIDENCE_RULES.get((source or "").upper())
+        if not rules:
+            return ""
+        token = f"{call_id or ''}:{operation or ''}".upper()
+        for keyword, evidence_type in rules:
+            if keyword in token:
+                return evidence_type
         return ""
 
-    def _flatten_source_results(
-        self,
-        by_call: Dict[str, CallResult],
-        plan_calls: List[ToolCall],
-    ) -> Dict[str, List[Dict[str, Any]]]:
-        flattened: Dict[str, List[Dict[str, Any]]] = {}
-        for call in plan_calls:
-            call_result = by_call.get(call.id)
-            if call_result is None:
-                continue
-            flattened.setdefault(call_result.source, []).extend(call_result.rows)
-        return flattened
-
-    def _flatten_citations(
+    def _flatten_results(
         self,
         by_call: Dict[str, CallResult],
         plan_calls: List[ToolCall],
-    ) -> List[Citation]:
-        out: List[Citation] = []
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Citation]]:
+        # by_call is filled in completion order; walk the plan once so rows and
+        # citations come out in plan order for both flattened views.
+        flattened: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
+        citations: List[Citation] = []
         for call in plan_calls:
             call_result = by_call.get(call.id)
             if call_result is None:
                 continue
-            out.extend(call_result.citations)
-        return out
+            flattened[call_result.source].extend(call_result.rows)
+            citations.extend(call_result.citations)
+        return dict(flattened), citations
 
     def _build_rows_preview(
         self,
@@ -704,12 +778,10 @@ class PlanExecutor:
         return build_rows_preview(rows, max_rows, max_columns, max_chars)
 
     def _rows_have_errors(self, rows: List[Dict[str, Any]]) -> bool:
-        for row in rows:
-            if not isinstance(row, dict):
-                continue
-            if row.get("error") or row.get("error_code"):
-                return True
-        return False
+        return any(
+            isinstance(row, dict) and (row.get("error") or row.get("error_code"))
+            for row in rows
+        )
 
     def _first_row_error(self, rows: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
         for row in rows:
@@ -4,15 +4,70 @@ Query Router - Classifies queries into retrieval paths.
 Routes: SQL, SEMANTIC, HYBRID
 """
 
+import copy
+import hashlib
+import itertools
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 from azure_openai_client import get_shared_client
-from shared_utils import OPENAI_API_VERSION, matches_any
+from semantic_cache import SemanticCache
+from shared_utils import (
+    OPENAI_API_VERSION,
+    count_keyword_classes,
+    env_bool,
+    env_int,
+    json_dumps,
+    json_loads,
+    matched_keyword_classes,
+    output_limit_kwargs,
+)
 
 logger = logging.getLogger(__name__)
 
+# Tighter timeout + no retries for routing — it has a heuristic fallback, so
+# burning 45s+retry here steals budget from synthesis.
+ROUTING_TIMEOUT_SECONDS = float(os.getenv("ROUTING_TIMEOUT_SECONDS", "20"))
+# Exact-match memo of successful LLM routes; 0 disables it.
+ROUTING_CACHE_SIZE = max(0, env_int("ROUTING_CACHE_SIZE", 1024))
+# Opt-in paraphrase cache: reuse a route when the query embedding is close
+# enough to one already routed under the same intent graph.
+ROUTING_SEMANTIC_CACHE = env_bool("ROUTING_SEMANTIC_CACHE", False)
+ROUTING_SEMANTIC_CACHE_SIZE = max(1, env_int("ROUTING_SEMANTIC_CACHE_SIZE", 4096))
+ROUTING_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("ROUTING_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Opt-in heuristic fast path: skip the LLM when at least this many distinct
+# keywords of one class match and none of the other. The LLM also selects
+# sources, so fast-path results carry none and rely on plan heuristics.
+ROUTING_HEURISTIC_FASTPATH = env_bool("ROUTING_HEURISTIC_FASTPATH", False)
+ROUTING_HEURISTIC_MIN_SCORE = max(1, env_int("ROUTING_HEURISTIC_MIN_SCORE", 2))
+# Optional pool of routing deployments. Calls sharing a cacheable prefix stick
+# to one deployment for the prompt-cache lifetime so its cache stays warm.
+ROUTING_DEPLOYMENTS = [
+    d.strip() for d in os.getenv("AZURE_OPENAI_ROUTING_DEPLOYMENTS", "").split(",") if d.strip()
+]
+ROUTING_STICKY_TTL_SECONDS = float(os.getenv("ROUTING_STICKY_TTL_SECONDS", "300"))
+ROUTING_STICKY_MAX_ENTRIES = 10_000
+# Stream routing responses and stop reading once the JSON object closes, so
+# trailing whitespace/tokens that JSON mode sometimes emits are not awaited.
+ROUTING_STREAM = env_bool("ROUTING_STREAM", False)
+# Output budget for the routing JSON (route, reasoning, sources, hints). GPT-5 /
+# o-series deployments count hidden reasoning against any completion cap, so
+# they get a reasoning-effort hint instead of a hard token limit.
+ROUTING_MAX_OUTPUT_TOKENS = max(0, env_int("ROUTING_MAX_OUTPUT_TOKENS", 400))
+ROUTING_REASONING_EFFORT = (os.getenv("ROUTING_REASONING_EFFORT", "low") or "").strip().lower()
+# Per-deployment circuit breaker: after this many consecutive routing failures
+# the LLM is skipped (heuristic fallback) until the reset window elapses.
+ROUTING_BREAKER_FAIL_MAX = max(1, env_int("ROUTING_BREAKER_FAIL_MAX", 5))
+ROUTING_BREAKER_RESET_SECONDS = float(os.getenv("ROUTING_BREAKER_RESET_SECONDS", "30"))
+
+ROUTING_FALLBACK_REASON = "Fallback to HYBRID due to routing error"
+
 
 ROUTING_PROMPT = """You are the retrieval planner for an aviation intelligence platform.
 Your job is to (1) classify the user query route and (2) select the optimal combination
@@ -376,47 +431,236 @@ Valid source names: SQL, KQL, GRAPH, VECTOR_OPS, VECTOR_REG, VECTOR_AIRPORT, NOS
 from retrieval_plan import VALID_SOURCES
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _read_streamed_json_object(stream) -> dict:
+    """Consume a streamed chat completion until its JSON object is complete.
+
+    Parsing is only attempted when a chunk contains a closing brace; once the
+    object decodes the stream is closed.  If it never decodes early, the full
+    body is parsed as usual (raising on invalid JSON).
+    """
+    parts: List[str] = []
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            parts.append(delta)
+            if "}" not in delta:
+                continue
+            try:
+                result, _ = _JSON_DECODER.raw_decode("".join(parts).lstrip())
+            except ValueError:
+                continue
+            return result
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+    return json_loads("".join(parts))
+
+
+def _output_limit_kwargs(model: str) -> dict:
+    """Per-deployment knobs that keep the routing completion short."""
+    return output_limit_kwargs(model, ROUTING_MAX_OUTPUT_TOKENS, ROUTING_REASONING_EFFORT)
+
+
+class _CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial per window."""
+
+    def __init__(self, fail_max: int, reset_seconds: float):
+        self.fail_max = fail_max
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._failures < self.fail_max:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_seconds:
+                # Let one trial call through; the rest wait for another window.
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this failure opens the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+                return self._failures == self.fail_max
+            return False
+
+
 class QueryRouter:
     """Routes queries to appropriate retrieval paths."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], Sequence[float]]] = None,
+        deployments: Optional[Sequence[str]] = None,
+    ):
         self.client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
-        self.model = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "aviation-chat-gpt5-mini")
+        # Routing is a small classification task; prefer the router/worker tier.
+        self.model = (
+            os.getenv("AZURE_OPENAI_ROUTER_DEPLOYMENT_NAME")
+            or os.getenv("AZURE_OPENAI_WORKER_DEPLOYMENT_NAME")
+            or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "aviation-chat-gpt5-mini")
+        )
+        self.deployments: List[str] = list(deployments or ROUTING_DEPLOYMENTS) or [self.model]
+        self._sticky: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._sticky_lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._breakers: Dict[str, _CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self._route_cache: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._route_cache_lock = threading.Lock()
+        self._embed_fn = embed_fn
+        self._semantic_cache: Optional[SemanticCache] = None
+        if embed_fn is not None and ROUTING_SEMANTIC_CACHE:
+            try:
+                self._semantic_cache = SemanticCache(
+                    ROUTING_SEMANTIC_CACHE_SIZE, ROUTING_SEMANTIC_CACHE_THRESHOLD
+                )
+            except ImportError:
+                logger.warning("ROUTING_SEMANTIC_CACHE requires numpy; semantic route cache disabled")
+
+    def _deployment_for(self, prompt_prefix: str) -> str:
+        """Pick a deployment, keeping identical prompt prefixes on the same one.
+
+        New prefixes are assigned round-robin; an assignment lives as long as
+        the provider's prompt cache (ROUTING_STICKY_TTL_SECONDS) and each hit
+        extends it.
+        """
+        if len(self.deployments) == 1:
+            return self.deployments[0]
+        key = hashlib.sha1(prompt_prefix[:4096].encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._sticky_lock:
+            entry = self._sticky.get(key)
+            if entry is not None and entry[1] > now:
+                deployment = entry[0]
+            else:
+                deployment = self.deployments[next(self._round_robin) % len(self.deployments)]
+            self._sticky[key] = (deployment, now + ROUTING_STICKY_TTL_SECONDS)
+            self._sticky.move_to_end(key)
+            while len(self._sticky) > ROUTING_STICKY_MAX_ENTRIES:
+                self._sticky.popitem(last=False)
+        return deployment
+
+    def _breaker_for(self, deployment: str) -> _CircuitBreaker:
+        breaker = self._breakers.get(deployment)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self._breakers.setdefault(
+                    deployment,
+                    _CircuitBreaker(ROUTING_BREAKER_FAIL_MAX, ROUTING_BREAKER_RESET_SECONDS),
+                )
+        return breaker
+
+    def _cached_route(self, key: Tuple[str, str]) -> Optional[dict]:
+        with self._route_cache_lock:
+            cached = self._route_cache.get(key)
+            if cached is None:
+                return None
+            self._route_cache.move_to_end(key)
+        return copy.deepcopy(cached)
+
+    def _store_route(self, key: Tuple[str, str], result: dict) -> None:
+        if ROUTING_CACHE_SIZE <= 0:
+            return
+        with self._route_cache_lock:
+            self._route_cache[key] = copy.deepcopy(result)
+            self._route_cache.move_to_end(key)
+            while len(self._route_cache) > ROUTING_CACHE_SIZE:
+                self._route_cache.popitem(last=False)
 
     def route(self, query: str, intent_graph: dict | None = None) -> dict:
         """Classify a query into a retrieval route using LLM.
 
         When *intent_graph* is provided it is appended as additional user
         context so the LLM can use authoritative_in / requires mappings
-        for source selection.
+        for source selection.  Successful routes are memoized on the
+        whitespace/case-normalized query plus intent graph (and, when enabled,
+        by embedding similarity); fallbacks are not.
         """
+        intent_context = json_dumps(intent_graph, default=str) if intent_graph else ""
+        cache_key = (" ".join(str(query or "").lower().split()), intent_context)
+        cached = self._cached_route(cache_key)
+        if cached is not None:
+            return cached
+
+        if ROUTING_HEURISTIC_FASTPATH:
+            heuristic, score = self.quick_route_scored(query)
+            if heuristic != "HYBRID" and score >= ROUTING_HEURISTIC_MIN_SCORE:
+                return {
+                    "route": heuristic,
+                    "reasoning": "heuristic-high-confidence",
+                    "sql_hint": None,
+                    "sources": [],
+                }
+
+        query_embedding = None
+        if self._semantic_cache is not None:
+            try:
+                query_embedding = self._embed_fn(query)
+            except Exception as exc:
+                logger.warning("Routing embedding failed; skipping semantic cache: %s", exc)
+            if query_embedding is not None:
+                similar = self._semantic_cache.lookup(query_embedding, intent_context)
+                if similar is not None:
+                    self._store_route(cache_key, similar)
+                    return similar
+
+        # The static system prompt plus any intent-graph context is the
+        # cacheable prefix; the query itself always comes last.
+        model = self._deployment_for(intent_context)
+        breaker = self._breaker_for(model)
+        if not breaker.allow():
+            return {"route": "HYBRID", "reasoning": ROUTING_FALLBACK_REASON}
+
         try:
             messages = [
                 {"role": "system", "content": ROUTING_PROMPT},
             ]
-            if intent_graph:
+            if intent_context:
                 messages.append({
                     "role": "user",
                     "content": (
                         "Intent graph context (use as PRIMARY guidance for source selection):\n"
-                        + json.dumps(intent_graph, default=str)
+                        + intent_context
                     ),
                 })
             messages.append({"role": "user", "content": query})
 
-            # Tighter timeout + no retries for routing — it has a heuristic
-            # fallback, so burning 45s+retry here steals budget from synthesis.
-            _routing_timeout = float(os.getenv("ROUTING_TIMEOUT_SECONDS", "20"))
             response = self.client.with_options(
-                timeout=_routing_timeout,
+                timeout=ROUTING_TIMEOUT_SECONDS,
                 max_retries=0,
             ).chat.completions.create(
-                model=self.model,
+                model=model,
                 messages=messages,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                stream=ROUTING_STREAM,
+                **_output_limit_kwargs(model),
             )
 
-            result = json.loads(response.choices[0].message.content)
+            if ROUTING_STREAM:
+                result = _read_streamed_json_object(response)
+            else:
+                result = json_loads(response.choices[0].message.content)
+            breaker.record_success()
 
             if "route" not in result:
                 result["route"] = "HYBRID"
@@ -426,8 +670,8 @@ class QueryRouter:
             # Parse and validate sources list.
             raw_sources = result.get("sources", [])
             result["sources"] = (
-                [s.upper() for s in raw_sources if isinstance(s, str) and s.upper() in VALID_SOURCES]
-                if isinstance(raw_sources, list)
+                [u for s in raw_sources if isinstance(s, str) and (u := s.upper()) in VALID_SOURCES]
+                if isinstance(raw_sources, list) and raw_sources
                 else []
             )
 
@@ -445,14 +689,40 @@ class QueryRouter:
             else:
                 result.pop("graph_hint", None)
 
+            self._store_route(cache_key, result)
+            if query_embedding is not None:
+                self._semantic_cache.store(query_embedding, intent_context, result)
             return result
         except Exception as exc:
             logger.warning("LLM routing failed, falling back to HYBRID: %s", exc)
+            if breaker.record_failure():
+                logger.warning(
+                    "Routing circuit opened for deployment=%s after %d failures; using heuristics for %.0fs",
+                    model, ROUTING_BREAKER_FAIL_MAX, ROUTING_BREAKER_RESET_SECONDS,
+                )
             return {
                 "route": "HYBRID",
-                "reasoning": "Fallback to HYBRID due to routing error",
+                "reasoning": ROUTING_FALLBACK_REASON,
             }
 
+    def route_many(
+        self,
+        queries: Sequence[str],
+        intent_graph: dict | None = None,
+        concurrency: int = 16,
+    ) -> List[dict]:
+        """Route several queries concurrently, returning results in input order.
+
+        Intended for batch work (evaluation sweeps, backfills): wall-clock is
+        bounded by the slowest routing call rather than their sum.  Each call
+        goes through ``route()`` and therefore shares its cache and fallback.
+        """
+        if not queries:
+            return []
+        workers = max(1, min(concurrency, len(queries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="route-many") as pool:
+            return list(pool.map(lambda q: self.route(q, intent_graph=intent_graph), queries))
+
     _SQL_KEYWORDS = frozenset({
         "top", "largest", "smallest", "compare", "list", "show",
         "how many", "total", "sum", "average", "count",
@@ -463,14 +733,13 @@ class QueryRouter:
         "describe", "summarize", "what happened", "example", "similar",
         "narrative", "context", "why", "lessons learned",
     })
-    _HYBRID_KEYWORDS = frozenset({"report", "asrs", "incident", "safety"})
+    _QUICK_ROUTE_CLASSES = (("sql", _SQL_KEYWORDS), ("semantic", _SEMANTIC_KEYWORDS))
 
     def quick_route(self, query: str) -> str:
         """Quick route classification using keyword heuristics."""
-        query_lower = query.lower()
-
-        has_sql = matches_any(query_lower, self._SQL_KEYWORDS)
-        has_semantic = matches_any(query_lower, self._SEMANTIC_KEYWORDS)
+        matched = matched_keyword_classes(query, self._QUICK_ROUTE_CLASSES)
+        has_sql = "sql" in matched
+        has_semantic = "semantic" in matched
 
         if has_sql and has_semantic:
             return "HYBRID"
@@ -479,11 +748,23 @@ class QueryRouter:
         if has_semantic:
             return "SEMANTIC"
 
-        if matches_any(query_lower, self._HYBRID_KEYWORDS):
-            return "HYBRID"
-
+        # Report/incident/safety phrasing and everything else default to HYBRID.
         return "HYBRID"
 
+    def quick_route_scored(self, query: str) -> Tuple[str, int]:
+        """Heuristic route plus its confidence: distinct keywords of the winning class.
+
+        Conflicting or absent keyword classes yield ``("HYBRID", 0)``.
+        """
+        counts = count_keyword_classes(query, self._QUICK_ROUTE_CLASSES)
+        sql_hits = counts.get("sql", 0)
+        semantic_hits = counts.get("semantic", 0)
+        if sql_hits and not semantic_hits:
+            return "SQL", sql_hits
+        if semantic_hits and not sql_hits:
+            return "SEMANTIC", semantic_hits
+        return "HYBRID", 0
+
     def smart_route(self, query: str, intent_graph: dict | None = None) -> dict:
         """LLM-driven routing with keyword heuristic fallback.
 
@@ -494,7 +775,7 @@ class QueryRouter:
         """
         result = self.route(query, intent_graph=intent_graph)
         # If the LLM route() succeeded with a valid route, return it directly.
-        if result.get("route") in ("SQL", "SEMANTIC", "HYBRID") and result.get("reasoning", "") != "Fallback to HYBRID due to routing error":
+        if result.get("route") in ("SQL", "SEMANTIC", "HYBRID") and result.get("reasoning", "") != ROUTING_FALLBACK_REASON:
             return result
         # LLM call failed — fall back to keyword heuristics.
         heuristic = self.quick_route(query)
@@ -506,9 +787,23 @@ class QueryRouter:
         }
 
 
+_shared_router: Optional[QueryRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_shared_router() -> QueryRouter:
+    """Return the process-wide QueryRouter, constructing it on first use."""
+    global _shared_router
+    if _shared_router is None:
+        with _router_lock:
+            if _shared_router is None:
+                _shared_router = QueryRouter()
+    return _shared_router
+
+
 def route_query(query: str, use_llm: bool = True, intent_graph: dict | None = None) -> dict:
     """Route a query to the appropriate retrieval path."""
-    router = QueryRouter()
+    router = get_shared_router()
     if use_llm:
         return router.route(query, intent_graph=intent_graph)
     return {"route": router.quick_route(query), "reasoning": "Heuristic routing"}
@@ -5,45 +5,22 @@ LLM-based query writers (Text2SQL / Text2KQL).
 
 from __future__ import annotations
 
-import json
 import os
 import re
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from azure_openai_client import get_shared_client
-from shared_utils import OPENAI_API_VERSION, supports_explicit_temperature as _supports_explicit_temperature
+from shared_utils import (
+    OPENAI_API_VERSION,
+    json_dumps,
+    supports_explicit_temperature as _supports_explicit_temperature,
+)
 
 
-def _init_client():
-    client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
-    return client
-
-
-def _strip_fences(text: str) -> str:
-    out = re.sub(r"^```(?:sql|kql|json)?\s*", "", text.strip(), flags=re.IGNORECASE)
-    out = re.sub(r"\s*```$", "", out)
-    return out.strip()
-
-
-class SQLWriter:
-    def __init__(self, model: Optional[str] = None):
-        self.client = _init_client()
-        self.model = (
-            model
-            or os.getenv("AZURE_OPENAI_WORKER_DEPLOYMENT_NAME")
-            or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "aviation-chat-gpt5-mini")
-        )
-
-    def generate(
-        self,
-        user_query: str,
-        evidence_type: str,
-        sql_schema: Dict[str, Any],
-        entities: Dict[str, Any],
-        time_window: Dict[str, Any],
-        constraints: Optional[Dict[str, Any]] = None,
-    ) -> str:
-        prompt = """You are SQL_WRITER. Output SQL ONLY.
+# The writer rules are static so they form a stable request prefix that
+# automatic prompt caching can reuse across calls.
+SQL_WRITER_PROMPT = """You are SQL_WRITER. Output SQL ONLY.
 
 Rules:
 - Use only tables/columns provided in sql_schema.
@@ -71,20 +48,107 @@ Rules:
   LEFT JOIN ops_mel_techlog_events t ON t.leg_id = l.leg_id
   LIMIT 50;
 """
-        payload = {
-            "user_query": user_query,
-            "evidence_type": evidence_type,
-            "sql_schema": sql_schema,
-            "entities": entities,
-            "time_window": time_window,
-            "constraints": constraints or {},
-        }
+
+
+KQL_WRITER_PROMPT = """You are KQL_WRITER. Output KQL ONLY.
+
+Rules:
+- Use only tables/columns provided in kql_schema.
+- Always include a time filter using the horizon.
+- Start with a valid table reference (or let-binding followed by a table).
+- Do not emit semicolons except required let-binding terminators.
+- Do not use unsupported functions (for example: time_now()).
+- If needed columns are missing, output exactly:
+// NEED_SCHEMA: <what is missing>
+- Never invent table names.
+- IMPORTANT: Airport codes, flight IDs, and other identifiers MUST come ONLY from the entities object provided in the payload. NEVER extract or infer identifiers from the user_query text itself.
+- If entities.airports AND entities.flight_ids are both empty, write a general aggregate query or output exactly:
+// NEED_SCHEMA: no specific entities provided
+"""
+
+
+# Serialized schema snapshots keyed by object identity. Schema providers hand
+# out the same snapshot dict until their TTL expires and never mutate it, so
+# the JSON can be reused across calls; the entry pins the dict so its id()
+# cannot be recycled while cached.
+_SCHEMA_JSON_CACHE_SIZE = 8
+_schema_json_cache: Dict[int, Tuple[Any, str]] = {}
+_schema_json_lock = threading.Lock()
+
+
+def _schema_json(schema: Any) -> str:
+    entry = _schema_json_cache.get(id(schema))
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+    text = json_dumps(schema)
+    with _schema_json_lock:
+        if len(_schema_json_cache) >= _SCHEMA_JSON_CACHE_SIZE:
+            _schema_json_cache.clear()
+        _schema_json_cache[id(schema)] = (schema, text)
+    return text
+
+
+def _writer_messages(
+    system_prompt: str,
+    schema_key: str,
+    schema: Any,
+    fields: Dict[str, Any],
+) -> List[Dict[str, str]]:
+    """Build writer messages ordered from most to least static.
+
+    Rules, then the schema snapshot (memoized JSON) in its own user message,
+    then the per-call fields with the user query last, so consecutive calls
+    share the longest possible cached prefix.
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": "{" + json_dumps(schema_key) + ":" + _schema_json(schema) + "}"},
+        {"role": "user", "content": json_dumps(fields)},
+    ]
+
+
+_FENCE_OPEN_RE = re.compile(r"^```(?:sql|kql|json)?\s*", re.IGNORECASE)
+_FENCE_CLOSE_RE = re.compile(r"\s*```$")
+
+
+def _strip_fences(text: str) -> str:
+    out = _FENCE_OPEN_RE.sub("", text.strip())
+    out = _FENCE_CLOSE_RE.sub("", out)
+    return out.strip()
+
+
+class SQLWriter:
+    def __init__(self, model: Optional[str] = None):
+        self.client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
+        self.model = (
+            model
+            or os.getenv("AZURE_OPENAI_WORKER_DEPLOYMENT_NAME")
+            or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "aviation-chat-gpt5-mini")
+        )
+
+    def generate(
+        self,
+        user_query: str,
+        evidence_type: str,
+        sql_schema: Dict[str, Any],
+        entities: Dict[str, Any],
+        time_window: Dict[str, Any],
+        constraints: Optional[Dict[str, Any]] = None,
+    ) -> str:
         request_kwargs = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(payload, ensure_ascii=True)},
-            ],
+            "messages": _writer_messages(
+                SQL_WRITER_PROMPT,
+                "sql_schema",
+                sql_schema,
+                {
+                    "constraints": constraints or {},
+                    "entities": entities,
+                    "time_window": time_window,
+                    "evidence_type": evidence_type,
+                    "user_query": user_query,
+                },
+            ),
         }
         if _supports_explicit_temperature(self.model):
             request_kwargs["temperature"] = 0
@@ -97,7 +161,7 @@ Rules:
 
 class KQLWriter:
     def __init__(self, model: Optional[str] = None):
-        self.client = _init_client()
+        self.client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
         self.model = (
             model
             or os.getenv("AZURE_OPENAI_WORKER_DEPLOYMENT_NAME")
@@ -113,35 +177,20 @@ class KQLWriter:
         time_window: Dict[str, Any],
         constraints: Optional[Dict[str, Any]] = None,
     ) -> str:
-        prompt = """You are KQL_WRITER. Output KQL ONLY.
-
-Rules:
-- Use only tables/columns provided in kql_schema.
-- Always include a time filter using the horizon.
-- Start with a valid table reference (or let-binding followed by a table).
-- Do not emit semicolons except required let-binding terminators.
-- Do not use unsupported functions (for example: time_now()).
-- If needed columns are missing, output exactly:
-// NEED_SCHEMA: <what is missing>
-- Never invent table names.
-- IMPORTANT: Airport codes, flight IDs, and other identifiers MUST come ONLY from the entities object provided in the payload. NEVER extract or infer identifiers from the user_query text itself.
-- If entities.airports AND entities.flight_ids are both empty, write a general aggregate query or output exactly:
-// NEED_SCHEMA: no specific entities provided
-"""
-        payload = {
-            "user_query": user_query,
-            "evidence_type": evidence_type,
-            "kql_schema": kql_schema,
-            "entities": entities,
-            "time_window": time_window,
-            "constraints": constraints or {},
-        }
         request_kwargs = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(payload, ensure_ascii=True)},
-            ],
+            "messages": _writer_messages(
+                KQL_WRITER_PROMPT,
+                "kql_schema",
+                kql_schema,
+                {
+                    "constraints": constraints or {},
+                    "entities": entities,
+                    "time_window": time_window,
+                    "evidence_type": evidence_type,
+                    "user_query": user_query,
+                },
+            ),
         }
         if _supports_explicit_temperature(self.model):
             request_kwargs["temperature"] = 0
@@ -5,11 +5,13 @@ Retrieval planning primitives for multi-source agentic RAG.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from shared_utils import (
     canon_tool,
+    env_int,
     normalize_source_policy,
     validate_source_policy_request,
     matches_any,
@@ -18,7 +20,9 @@ from shared_utils import (
 )
 
 
-VALID_SOURCES = {
+RETRIEVAL_PLAN_CACHE_SIZE = max(0, env_int("RETRIEVAL_PLAN_CACHE_SIZE", 1024))
+
+VALID_SOURCES: FrozenSet[str] = frozenset({
     "SQL",
     "KQL",
     "GRAPH",
@@ -27,11 +31,11 @@ VALID_SOURCES = {
     "VECTOR_AIRPORT",
     "NOSQL",
     "FABRIC_SQL",
-}
+})
 
 def _norm_source(value: str) -> Optional[str]:
-    src = canon_tool(value)
-    return src if src in VALID_SOURCES else None
+    # canon_tool only yields known tools, which are exactly VALID_SOURCES.
+    return canon_tool(value) or None
 
 
 def _norm_source_policy(value: str) -> str:
@@ -96,6 +100,7 @@ class RetrievalPlan:
     route: str
     reasoning: str
     profile: str
+    # Kept in ascending priority order by build_retrieval_plan.
     steps: List[SourcePlan] = field(default_factory=list)
 
     def to_event_payload(self) -> Dict[str, Any]:
@@ -103,7 +108,7 @@ class RetrievalPlan:
             "route": self.route,
             "reasoning": self.reasoning,
             "profile": self.profile,
-            "steps": [s.to_dict() for s in sorted(self.steps, key=lambda x: x.priority)],
+            "steps": [s.to_dict() for s in self.steps],
         }
 
 
@@ -134,35 +139,28 @@ _NOSQL_MARKERS = frozenset({
 })
 
 
-def _wants_realtime(query_l: str) -> bool:
-    return matches_any(query_l, _REALTIME_MARKERS)
-
-
-def _wants_graph(query_l: str) -> bool:
-    return matches_any(query_l, _GRAPH_MARKERS)
-
-
-def _wants_regulatory(query_l: str) -> bool:
-    return matches_any(query_l, _REGULATORY_MARKERS)
-
-
-def _wants_narrative(query_l: str) -> bool:
-    return matches_any(query_l, _NARRATIVE_MARKERS)
-
-
-def _wants_airport_ops(query_l: str) -> bool:
-    return matches_any(query_l, _AIRPORT_OPS_MARKERS)
+# Marker classes consulted when planning.  Each class is matched with its
+# own cached pattern: one combined alternation would let a marker consume
+# text another class needs ("depends on" swallowing the "on" of "on time").
+_MARKER_CLASSES: Tuple[Tuple[str, FrozenSet[str]], ...] = (
+    ("realtime", _REALTIME_MARKERS),
+    ("graph", _GRAPH_MARKERS),
+    ("regulatory", _REGULATORY_MARKERS),
+    ("narrative", _NARRATIVE_MARKERS),
+    ("airport_ops", _AIRPORT_OPS_MARKERS),
+    ("nosql", _NOSQL_MARKERS),
+    ("fabric_delay", FABRIC_SQL_DELAY_TRIGGERS),
+    ("ops_table", OPS_TABLE_SIGNALS),
+)
 
 
-def _wants_nosql(query_l: str) -> bool:
-    return matches_any(query_l, _NOSQL_MARKERS)
+def _marker_hits(query_l: str) -> FrozenSet[str]:
+    """Return the marker classes present in *query_l*."""
+    return frozenset(name for name, markers in _MARKER_CLASSES if matches_any(query_l, markers))
 
 
-def _wants_analytics(query_l: str) -> bool:
-    return (
-        matches_any(query_l, FABRIC_SQL_DELAY_TRIGGERS)
-        and not matches_any(query_l, OPS_TABLE_SIGNALS)
-    )
+def _wants_analytics(hits: FrozenSet[str]) -> bool:
+    return "fabric_delay" in hits and "ops_table" not in hits
 
 
 def build_retrieval_plan(
@@ -171,27 +169,65 @@ def build_retrieval_plan(
     route_reasoning: str,
     router_sources: Optional[List[str]] = None,
 ) -> RetrievalPlan:
-    query_l = request.query.lower()
+    """Build the source plan for *request*.
+
+    The query only influences the plan through its marker classes, so steps
+    are memoized on those classes plus the request knobs; every marker-free
+    ``(route, profile)`` pair collapses onto one template.  Callers get their
+    own copy of the steps and params.
+    """
     profile = (request.query_profile or "pilot-brief").strip().lower()
     source_policy = _norm_source_policy(request.source_policy)
+    hits = frozenset() if source_policy == "exact" else _marker_hits(request.query.lower())
+    template = _plan_steps_cached(
+        hits,
+        profile,
+        source_policy,
+        tuple(request.required_sources),
+        request.freshness_sla_minutes,
+        request.retrieval_mode,
+        route,
+        tuple(router_sources or ()),
+    )
+    steps = [replace(s, params=dict(s.params)) for s in template]
+    reasoning = route_reasoning
+    if request.explain_retrieval:
+        reasoning = (
+            f"{route_reasoning}; profile={profile}; source_policy={source_policy};"
+            f" sources={','.join(s.source for s in steps)}"
+        )
+    return RetrievalPlan(route=route, reasoning=reasoning, profile=profile, steps=steps)
 
-    steps: List[SourcePlan] = []
+
+@lru_cache(maxsize=RETRIEVAL_PLAN_CACHE_SIZE)
+def _plan_steps_cached(
+    hits: FrozenSet[str],
+    profile: str,
+    source_policy: str,
+    required_sources: Tuple[str, ...],
+    freshness_sla_minutes: Optional[int],
+    retrieval_mode: str,
+    route: str,
+    router_sources: Tuple[str, ...],
+) -> Tuple[SourcePlan, ...]:
+    steps_map: Dict[str, SourcePlan] = {}
 
     def add(source: str, reason: str, priority: int, params: Optional[Dict[str, Any]] = None) -> None:
-        if any(s.source == source for s in steps):
+        if source in steps_map:
             return
-        steps.append(
-            SourcePlan(
-                source=source,
-                reason=reason,
-                priority=priority,
-                params=params or {},
-            )
+        steps_map[source] = SourcePlan(
+            source=source,
+            reason=reason,
+            priority=priority,
+            params=params or {},
         )
 
+    def ordered_steps() -> Tuple[SourcePlan, ...]:
+        return tuple(sorted(steps_map.values(), key=lambda x: x.priority))
+
     # Exact source policy runs only requested sources, in request order.
     if source_policy == "exact":
-        validation = validate_source_policy_request(request.required_sources, source_policy)
+        validation = validate_source_policy_request(required_sources, source_policy)
         if not validation["is_valid"]:
             raise ExactPolicyValidationError(
                 validation["error_message"] or "Invalid exact source policy request.",
@@ -201,13 +237,7 @@ def build_retrieval_plan(
             )
         for idx, src in enumerate(validation["required_sources_normalized"]):
             add(src, "Required by request (exact source policy)", 1 + idx)
-        reasoning = route_reasoning
-        if request.explain_retrieval:
-            reasoning = (
-                f"{route_reasoning}; profile={profile}; source_policy=exact;"
-                f" sources={','.join(s.source for s in sorted(steps, key=lambda x: x.priority))}"
-            )
-        return RetrievalPlan(route=route, reasoning=reasoning, profile=profile, steps=steps)
+        return ordered_steps()
 
     # When the router provides an explicit source list, use it as primary.
     if router_sources:
@@ -232,46 +262,46 @@ def build_retrieval_plan(
             add("SQL", "Fleet applicability checks", 25)
 
         # Query-driven source activation.
-        if _wants_realtime(query_l) or (request.freshness_sla_minutes is not None and request.freshness_sla_minutes <= 60):
-            add("KQL", "Live operational and weather windows", 5, {"window_minutes": request.freshness_sla_minutes or 60})
+        if "realtime" in hits or (freshness_sla_minutes is not None and freshness_sla_minutes <= 60):
+            add("KQL", "Live operational and weather windows", 5, {"window_minutes": freshness_sla_minutes or 60})
 
-        if _wants_graph(query_l):
+        if "graph" in hits:
             add("GRAPH", "Dependency and impact traversal", 8, {"hops": 2})
 
-        if _wants_regulatory(query_l):
+        if "regulatory" in hits:
             add("VECTOR_REG", "NOTAM/AD and compliance lookup", 12)
 
-        if _wants_narrative(query_l):
+        if "narrative" in hits:
             add("VECTOR_OPS", "Narrative similarity retrieval", 18)
 
-        if _wants_airport_ops(query_l):
+        if "airport_ops" in hits:
             add("VECTOR_AIRPORT", "Airport/runway/station document lookup", 22)
 
-        if _wants_nosql(query_l):
+        if "nosql" in hits:
             add("NOSQL", "Operational document / NOTAM lookup", 24)
 
-        if _wants_analytics(query_l):
+        if _wants_analytics(hits):
             add("FABRIC_SQL", "BTS on-time analytics and delay causes", 15)
 
-        if request.retrieval_mode == "foundry-iq":
+        if retrieval_mode == "foundry-iq":
             add("VECTOR_OPS", "Foundry IQ semantic-first context", 15)
 
     # Required sources from caller.
-    for raw in request.required_sources:
+    for raw in required_sources:
         src = _norm_source(raw)
         if src:
             add(src, "Required by request", 1)
 
     # Fallback guarantees.
-    if not steps:
+    if not steps_map:
         add("SQL", "Default fallback source", 10)
         add("VECTOR_OPS", "Default semantic fallback", 20)
 
-    reasoning = route_reasoning
-    if request.explain_retrieval:
-        reasoning = (
-            f"{route_reasoning}; profile={profile}; source_policy={source_policy};"
-            f" sources={','.join(s.source for s in sorted(steps, key=lambda x: x.priority))}"
-        )
+    return ordered_steps()
 
-    return RetrievalPlan(route=route, reasoning=reasoning, profile=profile, steps=steps)
+
+# Warm the marker-free template for every baseline route/profile pair.
+for _route in ("SQL", "SEMANTIC", "HYBRID"):
+    for _profile in ("pilot-brief", "ops-live", "operations", "compliance", "regulatory"):
+        _plan_steps_cached(frozenset(), _profile, "include", (), None, "code-rag", _route, ())
+del _route, _profile
@@ -5,14 +5,76 @@ Schema snapshots for SQL/KQL/Graph routing.
 
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
 import os
 import time
-from typing import Any, Dict, List
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
+from shared_utils import json_dumps, json_loads
 from unified_retriever import UnifiedRetriever
 
+logger = logging.getLogger(__name__)
+
 KQL_SCHEMA_JSON = os.getenv("FABRIC_KQL_SCHEMA_JSON", "").strip()
+# Directory for snapshots persisted across worker restarts; empty disables it.
+SCHEMA_CACHE_PATH = os.getenv("SCHEMA_CACHE_PATH", "").strip()
+
+# Compact default KQL schema for prompt guidance.  Immutable: each snapshot
+# gets its own list copies, so callers may mutate them.  Must match actual
+# Kusto tables created by scripts/10_push_to_kusto.py.
+_STATIC_KQL_TABLES: Tuple[Dict[str, Any], ...] = (
+    {
+        "table": "opensky_states",
+        "columns": (
+            "icao24", "callsign", "origin_country", "time_position",
+            "last_contact", "longitude", "latitude", "baro_altitude",
+            "on_ground", "velocity", "true_track", "vertical_rate",
+            "geo_altitude", "squawk", "position_source",
+        ),
+    },
+    {
+        "table": "hazards_airsigmets",
+        "columns": (
+            "raw_text", "valid_time_from", "valid_time_to", "points",
+            "min_ft_msl", "max_ft_msl", "movement_dir_degrees",
+            "movement_speed_kt", "hazard", "severity", "airsigmet_type",
+        ),
+    },
+    {
+        "table": "hazards_gairmets",
+        "columns": (
+            "receipt_time", "issue_time", "expire_time", "product",
+            "tag", "issue_to_valid_hours", "valid_time", "hazard",
+            "geometry_type", "due_to", "points",
+        ),
+    },
+    {
+        "table": "hazards_aireps_raw",
+        "columns": ("raw_line",),
+    },
+    {
+        "table": "ops_graph_edges",
+        "columns": ("src_type", "src_id", "edge_type", "dst_type", "dst_id"),
+    },
+)
+
+_GRAPH_NODE_TYPES: Tuple[str, ...] = (
+    "Airport", "Runway", "FlightLeg", "Tail", "Crew",
+    "NOTAM", "Route", "Airline", "Navaid", "Frequency",
+    "ASRSReport", "Intent", "EvidenceType", "Tool",
+)
+_GRAPH_EDGE_TYPES: Tuple[str, ...] = (
+    "DEPARTS", "ARRIVES", "OPERATES", "HAS_RUNWAY",
+    "SERVED_BY_ROUTE", "OPERATED_BY", "HAS_NAVAID",
+    "HAS_FREQUENCY", "AFFECTS", "AFFECTS_RUNWAY",
+    "CREWED_BY", "MEL_ON", "REPORTED_AT", "CONNECTS",
+    "SAME_CITY", "REQUIRES", "AUTHORITATIVE_IN",
+    "EXPANDS_TO",
+)
 
 
 class SchemaProvider:
@@ -25,29 +87,96 @@ class SchemaProvider:
         self.cache_ttl_seconds = max(0, ttl)
         self._cached_snapshot: Dict[str, Any] = {}
         self._cache_expires_at: float = 0.0
+        self._sql_fingerprint: Optional[str] = None
+        self._disk_cache_path = self._resolve_disk_cache_path()
+        self._load_disk_cache()
 
     def snapshot(self) -> Dict[str, Any]:
         now = time.time()
         if self._cached_snapshot and now < self._cache_expires_at:
             return self._cached_snapshot
 
+        # An unchanged catalog fingerprint lets an expired snapshot keep its
+        # SQL schema; only the fingerprint query runs each TTL.
+        fingerprint = self._current_sql_fingerprint()
+        if self._cached_snapshot and fingerprint and fingerprint == self._sql_fingerprint:
+            sql_schema = self._cached_snapshot["sql_schema"]
+        else:
+            sql_schema = self._sql_schema()
+        self._sql_fingerprint = fingerprint
+
         payload = {
-            "sql_schema": self._sql_schema(),
+            "sql_schema": sql_schema,
             "kql_schema": self._kql_schema(),
             "graph_schema": self._graph_schema(),
         }
         self._cached_snapshot = payload
         self._cache_expires_at = now + self.cache_ttl_seconds
+        self._store_disk_cache(payload)
         return payload
 
+    def _resolve_disk_cache_path(self) -> Optional[Path]:
+        if not SCHEMA_CACHE_PATH or self.cache_ttl_seconds <= 0:
+            return None
+        # Key the file by backend and endpoints so environments sharing a
+        # volume never read each other's schema.
+        identity = "|".join([
+            str(getattr(self.retriever, "sql_backend", "")),
+            os.getenv("PGHOST", ""),
+            os.getenv("PGDATABASE", "aviationrag"),
+            ",".join(getattr(self.retriever, "sql_visible_schemas", None) or []),
+            os.getenv("KQL_SCHEMA_MODE", "static").strip().lower(),
+            os.getenv("FABRIC_KQL_ENDPOINT", "").strip(),
+        ])
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+        return Path(SCHEMA_CACHE_PATH) / f"schema-snapshot-{digest}.json"
+
+    def _load_disk_cache(self) -> None:
+        path = self._disk_cache_path
+        if path is None:
+            return
+        try:
+            expires_at = path.stat().st_mtime + self.cache_ttl_seconds
+            if time.time() >= expires_at:
+                return
+            payload = json_loads(path.read_bytes())
+        except FileNotFoundError:
+            return
+        except Exception as exc:
+            logger.warning("Ignoring unreadable schema cache %s: %s", path, exc)
+            return
+        if isinstance(payload, dict) and "sql_schema" in payload:
+            self._cached_snapshot = payload
+            self._cache_expires_at = expires_at
+
+    def _store_disk_cache(self, payload: Dict[str, Any]) -> None:
+        path = self._disk_cache_path
+        if path is None:
+            return
+        # Failed collections should be retried by the next worker, not pinned.
+        if any(isinstance(part, dict) and part.get("error") for part in payload.values()):
+            return
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json_dumps(payload, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception as exc:
+            logger.warning("Failed to persist schema cache %s: %s", path, exc)
+
     def _sql_schema(self) -> Dict[str, Any]:
         return self.retriever.current_sql_schema()
 
+    def _current_sql_fingerprint(self) -> Optional[str]:
+        fingerprint_fn = getattr(self.retriever, "sql_schema_fingerprint", None)
+        return fingerprint_fn() if callable(fingerprint_fn) else None
+
     def _parse_kql_show_schema(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
         if not rows:
             return {"tables": []}
 
-        table_map: Dict[str, List[Dict[str, str]]] = {}
+        # Column dicts keep first-seen order and make duplicate checks O(1).
+        table_map: Dict[str, Dict[str, str]] = defaultdict(dict)
         for row in rows:
             if not isinstance(row, dict):
                 continue
@@ -56,11 +185,12 @@ class SchemaProvider:
             column_type = str(row.get("ColumnType") or row.get("column_type") or row.get("Type") or "string").strip()
             if not table or not column:
                 continue
-            table_map.setdefault(table, [])
-            if not any(c["name"] == column for c in table_map[table]):
-                table_map[table].append({"name": column, "type": column_type})
+            table_map[table].setdefault(column, column_type)
 
-        tables = [{"table": t, "columns": cols} for t, cols in sorted(table_map.items(), key=lambda x: x[0])]
+        tables = [
+            {"table": t, "columns": [{"name": name, "type": col_type} for name, col_type in cols.items()]}
+            for t, cols in sorted(table_map.items())
+        ]
         return {"tables": tables}
 
     def _kql_schema(self) -> Dict[str, Any]:
@@ -103,47 +233,14 @@ class SchemaProvider:
                     return parsed
             except Exception:
                 pass
-        # Compact default schema for prompt guidance.
-        # Must match actual Kusto tables created by scripts/10_push_to_kusto.py.
         return {
             "database": database,
             "source": "static-default",
             "collected_at": self.retriever._now_iso(),
             "schema_version": "static-default-v2",
             "tables": [
-                {
-                    "table": "opensky_states",
-                    "columns": [
-                        "icao24", "callsign", "origin_country", "time_position",
-                        "last_contact", "longitude", "latitude", "baro_altitude",
-                        "on_ground", "velocity", "true_track", "vertical_rate",
-                        "geo_altitude", "squawk", "position_source",
-                    ],
-                },
-                {
-                    "table": "hazards_airsigmets",
-                    "columns": [
-                        "raw_text", "valid_time_from", "valid_time_to", "points",
-                        "min_ft_msl", "max_ft_msl", "movement_dir_degrees",
-                        "movement_speed_kt", "hazard", "severity", "airsigmet_type",
-                    ],
-                },
-                {
-                    "table": "hazards_gairmets",
-                    "columns": [
-                        "receipt_time", "issue_time", "expire_time", "product",
-                        "tag", "issue_to_valid_hours", "valid_time", "hazard",
-                        "geometry_type", "due_to", "points",
-                    ],
-                },
-                {
-                    "table": "hazards_aireps_raw",
-                    "columns": ["raw_line"],
-                },
-                {
-                    "table": "ops_graph_edges",
-                    "columns": ["src_type", "src_id", "edge_type", "dst_type", "dst_id"],
-                },
+                {"table": entry["table"], "columns": list(entry["columns"])}
+                for entry in _STATIC_KQL_TABLES
             ],
         }
 
@@ -152,13 +249,6 @@ class SchemaProvider:
             "source": "builtin-default",
             "collected_at": self.retriever._now_iso(),
             "schema_version": "graph-default-v3",
-            "node_types": ["Airport", "Runway", "FlightLeg", "Tail", "Crew",
-                           "NOTAM", "Route", "Airline", "Navaid", "Frequency",
-                           "ASRSReport", "Intent", "EvidenceType", "Tool"],
-            "edge_types": ["DEPARTS", "ARRIVES", "OPERATES", "HAS_RUNWAY",
-                           "SERVED_BY_ROUTE", "OPERATED_BY", "HAS_NAVAID",
-                           "HAS_FREQUENCY", "AFFECTS", "AFFECTS_RUNWAY",
-                           "CREWED_BY", "MEL_ON", "REPORTED_AT", "CONNECTS",
-                           "SAME_CITY", "REQUIRES", "AUTHORITATIVE_IN",
-                           "EXPANDS_TO"],
+            "node_types": list(_GRAPH_NODE_TYPES),
+            "edge_types": list(_GRAPH_EDGE_TYPES),
         }
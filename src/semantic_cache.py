@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Embedding-keyed paraphrase cache shared by the LLM-backed planners.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from typing import Any, List, Optional, Sequence
+
+
+class SemanticCache:
+    """FIFO cache of values keyed by unit-normalized query embeddings.
+
+    Keys live in one preallocated float32 matrix so a lookup is a single
+    matrix-vector product; entries only match under the same context string.
+    """
+
+    def __init__(self, capacity: int, threshold: float):
+        # numpy is only needed when the cache is enabled; importing it lazily
+        # keeps it off the import path of callers that never enable it.
+        import numpy as np
+
+        self._np = np
+        self.capacity = capacity
+        self.threshold = threshold
+        self._keys = None
+        self._context_hashes = np.zeros(capacity, dtype=np.int64)
+        self._values: List[Any] = []
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    def _normalize(self, embedding: Sequence[float]):
+        np = self._np
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        if vec.ndim != 1 or norm == 0.0:
+            return None
+        return vec / norm
+
+    def lookup(self, embedding: Sequence[float], context: str) -> Optional[Any]:
+        vec = self._normalize(embedding)
+        if vec is None:
+            return None
+        with self._lock:
+            count = len(self._values)
+            if not count or self._keys.shape[1] != vec.shape[0]:
+                return None
+            sims = self._keys[:count] @ vec
+            sims[self._context_hashes[:count] != hash(context)] = -1.0
+            best = int(self._np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            return copy.deepcopy(self._values[best])
+
+    def store(self, embedding: Sequence[float], context: str, result: Any) -> None:
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+        with self._lock:
+            if self._keys is None or self._keys.shape[1] != vec.shape[0]:
+                self._keys = self._np.zeros((self.capacity, vec.shape[0]), dtype=self._np.float32)
+                self._values = []
+                self._next_slot = 0
+            slot = self._next_slot
+            self._keys[slot] = vec
+            self._context_hashes[slot] = hash(context)
+            if slot < len(self._values):
+                self._values[slot] = copy.deepcopy(result)
+            else:
+                self._values.append(copy.deepcopy(result))
+            self._next_slot = (slot + 1) % self.capacity
@@ -8,31 +8,47 @@ previously defined independently in multiple modules.
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import re
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from functools import lru_cache
-from typing import Any, Dict, FrozenSet, List, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
-load_dotenv()
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+# Deployed containers get configuration from the environment; SKIP_DOTENV=1
+# avoids the .env lookup (filesystem walk) at import time there.
+if os.getenv("SKIP_DOTENV", "").strip() != "1":
+    load_dotenv()
 
 # ---------------------------------------------------------------------------
 # Azure OpenAI API version (previously duplicated in 4+ files)
 # ---------------------------------------------------------------------------
-OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-06-01")
+# 2024-10-21 is the first GA version with automatic prompt caching; it matches
+# the deploy manifests.
+DEFAULT_OPENAI_API_VERSION = "2024-10-21"
+OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_OPENAI_API_VERSION)
 
 # ---------------------------------------------------------------------------
 # Environment helpers
 # ---------------------------------------------------------------------------
 
+_TRUTHY = frozenset({"1", "true", "yes", "y", "on"})
+
+
 def env_bool(name: str, default: bool) -> bool:
     """Read a boolean from an environment variable."""
     raw = os.getenv(name, "").strip()
     if not raw:
         return default
-    return raw.lower() in {"1", "true", "yes", "y", "on"}
+    return raw.lower() in _TRUTHY
 
 
 def env_int(name: str, default: int) -> int:
@@ -65,6 +81,45 @@ def env_csv(name: str, default: str) -> List[str]:
     return out
 
 
+# ---------------------------------------------------------------------------
+# JSON helpers (orjson when installed, stdlib otherwise)
+# ---------------------------------------------------------------------------
+
+# Both encoders emit the same text: compact separators, raw UTF-8, and
+# datetimes/dataclasses handed to *default* as the stdlib does rather than
+# orjson's native encodings.
+_ORJSON_OPTIONS = (
+    _orjson.OPT_NON_STR_KEYS | _orjson.OPT_PASSTHROUGH_DATETIME | _orjson.OPT_PASSTHROUGH_DATACLASS
+    if _orjson is not None
+    else 0
+)
+
+
+def _stdlib_json_dumps(value: Any, default: Optional[Callable[[Any], Any]]) -> str:
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(",", ":"))
+
+
+def json_dumps(value: Any, *, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize *value* to compact JSON text."""
+    if _orjson is not None:
+        return _orjson.dumps(value, default=default, option=_ORJSON_OPTIONS).decode("utf-8")
+    return _stdlib_json_dumps(value, default)
+
+
+def json_dumps_bytes(value: Any, *, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize *value* to compact UTF-8 JSON, e.g. for an HTTP request body."""
+    if _orjson is not None:
+        return _orjson.dumps(value, default=default, option=_ORJSON_OPTIONS)
+    return _stdlib_json_dumps(value, default).encode("utf-8")
+
+
+def json_loads(text: str | bytes) -> Any:
+    """Parse JSON text or bytes."""
+    if _orjson is not None:
+        return _orjson.loads(text)
+    return json.loads(text)
+
+
 # ---------------------------------------------------------------------------
 # Time helpers
 # ---------------------------------------------------------------------------
@@ -78,34 +133,114 @@ def utc_now() -> str:
 # Model capability helpers
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=256)
 def supports_explicit_temperature(model_name: str) -> bool:
-    """GPT-5/o-series deployments reject explicit temperature overrides."""
+    """GPT-5/o-series deployments reject explicit temperature overrides.
+
+    Cached per deployment name: it is consulted on every LLM call with the
+    same handful of names.
+    """
     model = (model_name or "").strip().lower()
     normalized = model.replace("-", "").replace("_", "")
     return not (
-        model.startswith("gpt-5")
-        or normalized.startswith("gpt5")
-        or "gpt5" in normalized
-        or model.startswith("o1")
-        or model.startswith("o3")
-        or model.startswith("o4")
+        "gpt5" in normalized
+        or model.startswith(("o1", "o3", "o4"))
         or normalized == "modelrouter"
     )
 
 
+@lru_cache(maxsize=256)
+def supports_reasoning_effort(model_name: str) -> bool:
+    """GPT-5/o-series deployments accept a ``reasoning_effort`` hint."""
+    model = (model_name or "").strip().lower()
+    normalized = model.replace("-", "").replace("_", "")
+    return "gpt5" in normalized or model.startswith(("o1", "o3", "o4"))
+
+
+def output_limit_kwargs(model: str, max_tokens: int, reasoning_effort: str) -> Dict[str, Any]:
+    """Deterministic, bounded-output ``create()`` kwargs for *model*.
+
+    Classic deployments get ``temperature=0`` plus a ``max_tokens`` cap.
+    GPT-5 / o-series deployments reject both (hidden reasoning counts against
+    any completion cap), so they get a ``reasoning_effort`` hint instead;
+    model-router deployments accept neither.
+    """
+    if supports_explicit_temperature(model):
+        kwargs: Dict[str, Any] = {"temperature": 0}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        return kwargs
+    if reasoning_effort and supports_reasoning_effort(model):
+        return {"reasoning_effort": reasoning_effort}
+    return {}
+
+
+def prompt_cache_kwargs(name: str, static_prefix: str) -> Dict[str, Any]:
+    """Extra ``create()`` kwargs routing a fixed prompt prefix to one cache key.
+
+    Requests sharing a ``prompt_cache_key`` land on the same server-side
+    prefix cache.  The key includes a digest of the prefix so editing the
+    prompt rotates it.  Opt-in via ``AZURE_OPENAI_PROMPT_CACHE_KEY`` because
+    older API versions reject the field; it is sent through ``extra_body`` so
+    any SDK version accepts it.
+    """
+    if not env_bool("AZURE_OPENAI_PROMPT_CACHE_KEY", False):
+        return {}
+    digest = hashlib.sha256(static_prefix.encode("utf-8")).hexdigest()[:12]
+    return {"extra_body": {"prompt_cache_key": f"{name}-{digest}"}}
+
+
 # ---------------------------------------------------------------------------
 # Row preview helpers (used by af_context_provider and plan_executor)
 # ---------------------------------------------------------------------------
 
+def _trim_preview(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[: max_chars - 3] + "..."
+
+
+def _preview_passthrough(value: Any, max_chars: int) -> Any:
+    return value
+
+
+def _preview_json(value: Any, max_chars: int) -> str:
+    try:
+        serialized = json_dumps(value)
+    except Exception:
+        serialized = str(value)
+    return _trim_preview(serialized, max_chars)
+
+
+def _preview_isoformat(value: Any, max_chars: int) -> str:
+    return value.isoformat()
+
+
+# Exact-type handlers for the common row value types; anything else
+# (subclasses, numpy scalars, pandas timestamps) takes the generic path.
+_PREVIEW_DISPATCH: Dict[type, Callable[[Any, int], Any]] = {
+    type(None): _preview_passthrough,
+    int: _preview_passthrough,
+    float: _preview_passthrough,
+    bool: _preview_passthrough,
+    str: _trim_preview,
+    dict: _preview_json,
+    list: _preview_json,
+    tuple: _preview_json,
+    datetime: _preview_isoformat,
+    date: _preview_isoformat,
+}
+
+
 def safe_preview_value(value: Any, max_chars: int = 180) -> Any:
     """Safely format a value for preview display."""
-    import json as _json
+    handler = _PREVIEW_DISPATCH.get(type(value))
+    if handler is not None:
+        return handler(value, max_chars)
 
-    if value is None or isinstance(value, (int, float, bool)):
+    if isinstance(value, (int, float, bool)):
         return value
 
     if isinstance(value, str):
-        return value if len(value) <= max_chars else value[: max_chars - 3] + "..."
+        return _trim_preview(value, max_chars)
 
     if hasattr(value, "isoformat"):
         try:
@@ -114,14 +249,12 @@ def safe_preview_value(value: Any, max_chars: int = 180) -> Any:
             pass
 
     if isinstance(value, (dict, list, tuple)):
-        try:
-            serialized = _json.dumps(value, ensure_ascii=True)
-        except Exception:
-            serialized = str(value)
-        return serialized if len(serialized) <= max_chars else serialized[: max_chars - 3] + "..."
+        return _preview_json(value, max_chars)
+
+    return _trim_preview(str(value), max_chars)
 
-    rendered = str(value)
-    return rendered if len(rendered) <= max_chars else rendered[: max_chars - 3] + "..."
+
+_PREVIEW_HIDDEN_KEYS = frozenset({"content_vector", "partial_schema", "fallback_sql"})
 
 
 def build_rows_preview(
@@ -134,20 +267,21 @@ def build_rows_preview(
     if not rows:
         return [], [], False
 
-    hidden_keys = {"content_vector", "partial_schema", "fallback_sql"}
     columns: List[str] = []
+    seen: set[str] = set()
     for row in rows:
         if not isinstance(row, dict):
             continue
-        for key in row.keys():
-            if not isinstance(key, str) or key.startswith("__") or key in hidden_keys:
+        for key in row:
+            if key in seen or not isinstance(key, str) or key.startswith("__") or key in _PREVIEW_HIDDEN_KEYS:
                 continue
-            if key not in columns:
-                columns.append(key)
-                if len(columns) >= max_columns:
-                    break
-        if len(columns) >= max_columns:
-            break
+            columns.append(key)
+            seen.add(key)
+            if len(columns) >= max_columns:
+                break
+        else:
+            continue
+        break
 
     preview: List[Dict[str, Any]] = []
     for row in rows[:max_rows]:
@@ -167,10 +301,20 @@ def build_rows_preview(
 # Word-boundary-aware keyword matching
 # ---------------------------------------------------------------------------
 
+def _keyword_alternation(keywords: FrozenSet[str]) -> str:
+    # Longest first so multi-word phrases win over their prefixes.
+    return "|".join(sorted((re.escape(k) for k in keywords if k), key=len, reverse=True))
+
+
 @lru_cache(maxsize=64)
 def _compile_keyword_pattern(keywords: FrozenSet[str]) -> re.Pattern:
-    escaped = sorted((re.escape(k) for k in keywords if k), key=len, reverse=True)
-    return re.compile(r"(?<!\w)(?:" + "|".join(escaped) + r")(?!\w)", re.IGNORECASE)
+    return re.compile(r"(?<!\w)(?:" + _keyword_alternation(keywords) + r")(?!\w)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=16)
+def _compile_keyword_classes(classes: Tuple[Tuple[str, FrozenSet[str]], ...]) -> re.Pattern:
+    groups = "|".join(f"(?P<{name}>{_keyword_alternation(keywords)})" for name, keywords in classes)
+    return re.compile(r"(?<!\w)(?:" + groups + r")(?!\w)", re.IGNORECASE)
 
 
 def matches_any(text: str, keywords: FrozenSet[str]) -> bool:
@@ -186,6 +330,33 @@ def matches_any(text: str, keywords: FrozenSet[str]) -> bool:
     return bool(_compile_keyword_pattern(keywords).search(text))
 
 
+def matched_keyword_classes(text: str, classes: Tuple[Tuple[str, FrozenSet[str]], ...]) -> FrozenSet[str]:
+    """Return the names of the keyword classes present in *text*.
+
+    All classes are compiled into one cached alternation with a named group
+    per class, so the text is scanned once (stopping early once every class
+    has matched) with the same boundary rules as ``matches_any``.
+    """
+    if not text or not classes:
+        return frozenset()
+    seen = set()
+    for match in _compile_keyword_classes(classes).finditer(text):
+        seen.add(match.lastgroup)
+        if len(seen) == len(classes):
+            break
+    return frozenset(seen)
+
+
+def count_keyword_classes(text: str, classes: Tuple[Tuple[str, FrozenSet[str]], ...]) -> Dict[str, int]:
+    """Count distinct keywords matched per class in a single scan of *text*."""
+    if not text or not classes:
+        return {}
+    hits: Dict[str, set] = {}
+    for match in _compile_keyword_classes(classes).finditer(text):
+        hits.setdefault(match.lastgroup, set()).add(match.group().lower())
+    return {name: len(keywords) for name, keywords in hits.items()}
+
+
 # ---------------------------------------------------------------------------
 # Centralized keyword sets for query classification
 # ---------------------------------------------------------------------------
@@ -298,11 +469,17 @@ TOOL_ALIASES: Dict[str, str] = {
 }
 
 
+# Upper-cased alias -> canonical tool, restricted to known tools, so
+# canonicalization is a single dict lookup.
+_TOOL_LOOKUP: Dict[str, str] = {
+    **{tool: tool for tool in KNOWN_TOOLS},
+    **{alias: tool for alias, tool in TOOL_ALIASES.items() if tool in KNOWN_TOOLS},
+}
+
+
 def canon_tool(raw: str) -> str:
     """Canonicalize a tool name to its standard form."""
-    value = (raw or "").strip().upper()
-    mapped = TOOL_ALIASES.get(value, value)
-    return mapped if mapped in KNOWN_TOOLS else ""
+    return _TOOL_LOOKUP.get((raw or "").strip().upper(), "")
 
 
 VALID_SOURCE_POLICIES: set[str] = {"include", "exact"}
@@ -3,11 +3,176 @@
 SQL Generator - Generates SQL from natural language queries.
 """
 
+import logging
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 
 from azure_openai_client import get_shared_client
-from shared_utils import OPENAI_API_VERSION
+from semantic_cache import SemanticCache
+from shared_utils import (
+    CITY_AIRPORT_MAP,
+    IATA_TO_ICAO_MAP,
+    ICAO_TO_IATA_MAP,
+    OPENAI_API_VERSION,
+    env_bool,
+    env_int,
+    output_limit_kwargs,
+    prompt_cache_kwargs,
+    supports_explicit_temperature,
+)
+
+logger = logging.getLogger(__name__)
+
+_FENCE_RE = re.compile(r"```(?:sql)?\n?")
+# A terminated statement: anything the model streams after this is fence or
+# commentary, so the stream can be closed early.
+_STATEMENT_END_RE = re.compile(r";[ \t]*\r?\n")
+# Literals that become SQL filters: numbers and flight ids ("2019", "TK1984"),
+# upper-case airport/carrier codes ("LTFM", "JFK") and quoted strings.  Known
+# airport codes and city names are also picked up in lower case.
+_QUESTION_LITERAL_RE = re.compile(r"\b\w*\d\w*\b|\b[A-Z]{2,4}\b|\"[^\"]*\"|'[^']*'")
+_WORD_RE = re.compile(r"\b[a-z]{3,4}\b")
+_KNOWN_AIRPORT_CODES = frozenset(IATA_TO_ICAO_MAP) | frozenset(ICAO_TO_IATA_MAP)
+
+# Process-wide memo of generated SQL keyed by (model, question, context) with
+# whitespace collapsed; 0 disables it.  Case is kept because literals such as
+# airport codes flow into the SQL.
+SQL_GENERATOR_CACHE_SIZE = max(0, env_int("SQL_GENERATOR_CACHE_SIZE", 1024))
+# Opt-in paraphrase cache: reuse SQL when the question embedding is nearly
+# identical to one already answered under the same context and with the same
+# literals (_question_literals), since near-duplicates that differ only by
+# airport or year still score above any usable threshold.
+SQL_GENERATOR_SEMANTIC_CACHE = env_bool("SQL_GENERATOR_SEMANTIC_CACHE", False)
+SQL_GENERATOR_SEMANTIC_CACHE_SIZE = max(1, env_int("SQL_GENERATOR_SEMANTIC_CACHE_SIZE", 2048))
+SQL_GENERATOR_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SQL_GENERATOR_SEMANTIC_CACHE_THRESHOLD", "0.97"))
+# Output budget for one SQL statement; 0 removes the cap.  Reasoning
+# deployments take SQL_GENERATOR_REASONING_EFFORT instead (unset by default so
+# they keep their own reasoning depth).
+SQL_GENERATOR_MAX_OUTPUT_TOKENS = max(0, env_int("SQL_GENERATOR_MAX_OUTPUT_TOKENS", 512))
+SQL_GENERATOR_REASONING_EFFORT = (os.getenv("SQL_GENERATOR_REASONING_EFFORT", "") or "").strip().lower()
+# Stream completions and stop reading once the statement is terminated.
+SQL_GENERATOR_STREAM = env_bool("SQL_GENERATOR_STREAM", False)
+# Answer a few fixed-shape ASRS questions from _SQL_TEMPLATES without an LLM
+# call.  Patterns must match the whole question, so any extra filter ("in
+# 2019", "at LTFM") falls through to the model.
+SQL_GENERATOR_TEMPLATES = env_bool("SQL_GENERATOR_TEMPLATES", False)
+# Request hedging: when a completion has not returned after this many ms, send
+# an identical second request and take whichever answers first, so a single
+# Azure latency spike does not become the user-visible p99.  0 disables it.
+# At most SQL_GENERATOR_MAX_HEDGES hedges are in flight per process so the
+# extra load stays bounded when the service is uniformly slow.
+SQL_GENERATOR_HEDGE_MS = max(0, env_int("AZURE_OPENAI_HEDGE_MS", 0))
+SQL_GENERATOR_MAX_HEDGES = max(1, env_int("SQL_GENERATOR_MAX_HEDGES", 4))
+_hedge_slots = threading.BoundedSemaphore(SQL_GENERATOR_MAX_HEDGES)
+_hedge_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="sql-hedge")
+# Client-side quota gate for bulk callers (eval suites, dashboards): requests
+# queue here instead of bouncing off the deployment's 429s and SDK retries.
+# AZURE_OPENAI_RPM paces request starts; SQL_GENERATOR_MAX_CONCURRENT caps
+# in-flight requests.  0 disables either.
+AZURE_OPENAI_RPM = max(0, env_int("AZURE_OPENAI_RPM", 0))
+SQL_GENERATOR_MAX_CONCURRENT = max(0, env_int("SQL_GENERATOR_MAX_CONCURRENT", 0))
+_sql_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_sql_cache_lock = threading.Lock()
+
+
+class _RateLimiter:
+    """Thread-safe token bucket admitting *per_minute* requests.
+
+    The bucket holds six seconds of quota, so short bursts start immediately
+    while sustained load is spread evenly across the minute.
+    """
+
+    def __init__(self, per_minute: int):
+        self._rate = per_minute / 60.0
+        self._capacity = max(1.0, per_minute / 10.0)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay = (1.0 - self._tokens) / self._rate
+            time.sleep(delay)
+
+
+_rate_limiter = _RateLimiter(AZURE_OPENAI_RPM) if AZURE_OPENAI_RPM else None
+_concurrency_slots = threading.BoundedSemaphore(SQL_GENERATOR_MAX_CONCURRENT) if SQL_GENERATOR_MAX_CONCURRENT else None
+
+
+@contextmanager
+def _request_slot() -> Iterator[None]:
+    """Hold a rate-limit token and a concurrency slot for one LLM request."""
+    if _rate_limiter is not None:
+        _rate_limiter.acquire()
+    if _concurrency_slots is None:
+        yield
+        return
+    with _concurrency_slots:
+        yield
+
+
+_TEMPLATE_DIMENSIONS = {
+    "flight phase": "flight_phase",
+    "aircraft type": "aircraft_type",
+    "location": "location",
+}
+
+# (pattern, SQL) pairs tried in order against the whitespace-collapsed
+# question.  Named groups are substituted into the SQL: ``n`` is a row limit,
+# ``dimension`` a key of _TEMPLATE_DIMENSIONS and ``keyword`` one or two
+# words of letters and hyphens, which is safe to quote and leaves no room for
+# a trailing filter.
+_SQL_TEMPLATES: Tuple[Tuple["re.Pattern[str]", str], ...] = tuple(
+    (re.compile(pattern, re.IGNORECASE), sql)
+    for pattern, sql in (
+        (
+            r"(?:show |list |what are )?(?:the )?(?:top|most common) (?P<n>\d{1,3}) "
+            r"(?P<dimension>flight phase|aircraft type|location)s?\??",
+            "SELECT {dimension}, COUNT(*) AS report_count FROM asrs_reports "
+            "WHERE {dimension} IS NOT NULL GROUP BY {dimension} "
+            "ORDER BY report_count DESC LIMIT {n}",
+        ),
+        (
+            r"(?:how many|count(?: of)?|number of) (?:asrs )?reports (?:per|by|each) year\??",
+            "SELECT EXTRACT(YEAR FROM event_date)::int AS year, COUNT(*) AS report_count "
+            "FROM asrs_reports WHERE event_date IS NOT NULL GROUP BY year ORDER BY year",
+        ),
+        (
+            r"(?:show |list |find )?(?:asrs )?reports (?:mentioning|about) "
+            r"[\"']?(?P<keyword>[a-z][a-z-]{1,24}"
+            r"(?: (?!(?:in|at|on|since|before|after|during|from)\b)[a-z][a-z-]{1,24})?)[\"']?\??",
+            "SELECT asrs_report_id, title, event_date FROM asrs_reports "
+            "WHERE LOWER(report_text) LIKE LOWER('%{keyword}%') "
+            "ORDER BY event_date DESC NULLS LAST LIMIT 20",
+        ),
+    )
+)
+
+
+def _match_template(question: str) -> Optional[str]:
+    """Return templated SQL when *question* has one of the fixed shapes."""
+    for pattern, sql in _SQL_TEMPLATES:
+        match = pattern.fullmatch(question)
+        if match is None:
+            continue
+        params = match.groupdict()
+        if "dimension" in params:
+            params["dimension"] = _TEMPLATE_DIMENSIONS[params["dimension"].lower()]
+        return sql.format(**params)
+    return None
 
 
 FULL_SCHEMA = """
@@ -208,46 +373,235 @@ Generate SQL queries based on natural language questions.
 11. Alias conventions: l = ops_flight_legs, m = ops_turnaround_milestones, c = ops_crew_rosters, t = ops_mel_techlog_events, b = ops_baggage_events. Never use alias "f" for a flights table — it does not exist.
 """
 
+# Shared by every request so the serialized system message (the cacheable
+# prompt prefix) is byte-identical; it is never mutated.
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
 
 class SQLGenerator:
     """Generate SQL queries from natural language using LLM."""
 
-    def __init__(self):
+    def __init__(self, embed_fn: Optional[Callable[[str], Sequence[float]]] = None):
         self.client, _ = get_shared_client(api_version=OPENAI_API_VERSION)
         self.model = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "aviation-chat-gpt5-mini")
+        # The model is fixed, so the request kwargs are built once.
+        self._create_kwargs = {
+            **prompt_cache_kwargs("sql-generator", SYSTEM_PROMPT),
+            **output_limit_kwargs(self.model, SQL_GENERATOR_MAX_OUTPUT_TOKENS, SQL_GENERATOR_REASONING_EFFORT),
+        }
+        if supports_explicit_temperature(self.model):
+            # End generation right after the statement instead of paying for
+            # a closing fence or explanation.
+            self._create_kwargs["stop"] = [";\n\n", "\n```"]
+        self._embed_fn = embed_fn
+        self._semantic_cache: Optional[SemanticCache] = None
+        if embed_fn is not None and SQL_GENERATOR_SEMANTIC_CACHE:
+            try:
+                self._semantic_cache = SemanticCache(
+                    SQL_GENERATOR_SEMANTIC_CACHE_SIZE, SQL_GENERATOR_SEMANTIC_CACHE_THRESHOLD
+                )
+            except ImportError:
+                logger.warning("SQL_GENERATOR_SEMANTIC_CACHE requires numpy; semantic SQL cache disabled")
+
+    @staticmethod
+    def _question_literals(question: str) -> str:
+        lowered = question.lower()
+        literals = {m.lower() for m in _QUESTION_LITERAL_RE.findall(question)}
+        literals.update(w for w in _WORD_RE.findall(lowered) if w.upper() in _KNOWN_AIRPORT_CODES)
+        literals.update(city for city in CITY_AIRPORT_MAP if city in lowered)
+        return " ".join(sorted(literals))
 
     def generate(self, query: str) -> str:
         """Generate SQL from natural language query."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": query}
-            ]
-        )
+        return self.generate_with_context(query)
 
-        sql = response.choices[0].message.content.strip()
+    def generate_with_context(self, query: str, context: str = None) -> str:
+        """Generate SQL with additional context.
+
+        Context (in practice the schema summary, which rarely changes) goes in
+        its own message between the static system prompt and the question, so
+        the cacheable prefix extends through it and only the question varies.
+        """
+        key = (self.model, " ".join(query.split()), " ".join((context or "").split()))
+        if SQL_GENERATOR_TEMPLATES:
+            templated = _match_template(key[1])
+            if templated is not None:
+                return templated
+        cached = _cached_sql(key)
+        if cached is not None:
+            return cached
+
+        semantic_context = f"{key[0]}\n{key[2]}\n{self._question_literals(key[1])}"
+        query_embedding = None
+        if self._semantic_cache is not None:
+            try:
+                query_embedding = self._embed_fn(key[1])
+            except Exception as exc:
+                logger.warning("SQL generator embedding failed; skipping semantic cache: %s", exc)
+            if query_embedding is not None:
+                similar = self._semantic_cache.lookup(query_embedding, semantic_context)
+                if similar is not None:
+                    _store_sql(key, similar)
+                    return similar
+
+        sql = self._complete(self._messages(query, context))
+        if sql:
+            _store_sql(key, sql)
+            if query_embedding is not None:
+                self._semantic_cache.store(query_embedding, semantic_context, sql)
+        return sql
 
-        sql = re.sub(r'```sql\n?', '', sql)
-        sql = re.sub(r'```\n?', '', sql)
-        sql = sql.strip()
+    def generate_many(self, queries: Sequence[str], concurrency: int = 5) -> List[str]:
+        """Generate SQL for several questions concurrently, in input order.
 
-        return sql
+        The shared client is thread-safe, so batch callers (evaluation
+        harnesses, multi-panel dashboards) wait for the slowest completion
+        rather than the sum of all of them.
+        """
+        if not queries:
+            return []
+        workers = max(1, min(concurrency, len(queries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-generate") as pool:
+            return list(pool.map(self.generate, queries))
 
-    def generate_with_context(self, query: str, context: str = None) -> str:
-        """Generate SQL with additional context."""
+    def generate_stream(self, query: str, context: str = None) -> Iterator[str]:
+        """Yield raw completion text as it arrives (fences are not stripped).
+
+        The stream is closed as soon as the statement's terminating ``;`` and
+        newline arrive, skipping any trailing fence or explanation tokens.
+        """
+        return self._stream(self._messages(query, context))
+
+    def _messages(self, query: str, context: Optional[str]) -> list:
         if context:
-            enhanced_query = f"{query}\n\nAdditional context: {context}"
+            return [
+                _SYSTEM_MESSAGE,
+                {"role": "user", "content": f"Additional context: {context}"},
+                {"role": "user", "content": query},
+            ]
+        return [_SYSTEM_MESSAGE, {"role": "user", "content": query}]
+
+    def _stream(self, messages: list) -> Iterator[str]:
+        # The slot is held until the stream is drained or closed.
+        with _request_slot():
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                **self._create_kwargs,
+            )
+            tail = ""
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content or ""
+                    if not delta:
+                        continue
+                    yield delta
+                    # Keep a short tail so a terminator split across chunks is seen.
+                    window = tail + delta
+                    if _STATEMENT_END_RE.search(window):
+                        return
+                    tail = window[-8:]
+            finally:
+                close = getattr(stream, "close", None)
+                if callable(close):
+                    close()
+
+    def _complete(self, messages: list) -> str:
+        if SQL_GENERATOR_STREAM:
+            sql = "".join(self._stream(messages)).strip()
         else:
-            enhanced_query = query
+            response = self._hedged_create(messages) if SQL_GENERATOR_HEDGE_MS else self._create(messages)
+            _log_prompt_cache_usage(response)
+            sql = response.choices[0].message.content.strip()
+        # Most completions are bare SQL; only run the regex when a fence exists.
+        if "```" in sql:
+            sql = _FENCE_RE.sub("", sql).strip()
 
-        return self.generate(enhanced_query)
+        return sql
+
+    def _create(self, messages: list):
+        with _request_slot():
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                **self._create_kwargs,
+            )
+
+    def _hedged_create(self, messages: list):
+        """Run ``_create`` and duplicate it once if it outlives the hedge delay.
+
+        The first successful response wins; the slower request cannot be
+        aborted mid-flight, so its result is simply discarded.  If one request
+        fails the other is still awaited before the error is raised.
+        """
+        primary = _hedge_pool.submit(self._create, messages)
+        try:
+            return primary.result(timeout=SQL_GENERATOR_HEDGE_MS / 1000)
+        except FutureTimeout:
+            pass
+        if not _hedge_slots.acquire(blocking=False):
+            return primary.result()
+        hedge = _hedge_pool.submit(self._create, messages)
+        hedge.add_done_callback(lambda _f: _hedge_slots.release())
+        logger.info("perf stage=%s hedge_ms=%d", "sql_generator_hedge", SQL_GENERATOR_HEDGE_MS)
+        error: Optional[BaseException] = None
+        for future in as_completed((primary, hedge)):
+            error = future.exception()
+            if error is None:
+                return future.result()
+        raise error
+
+
+def _log_prompt_cache_usage(response) -> None:
+    # cached_tokens is only reported by API versions with prompt caching.
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    if isinstance(cached, int):
+        logger.info(
+            "perf stage=%s prompt_tokens=%s cached_tokens=%d",
+            "sql_generator_prompt", getattr(usage, "prompt_tokens", None), cached,
+        )
+
+
+def _cached_sql(key: Tuple[str, str, str]) -> Optional[str]:
+    with _sql_cache_lock:
+        sql = _sql_cache.get(key)
+        if sql is not None:
+            _sql_cache.move_to_end(key)
+        return sql
+
+
+def _store_sql(key: Tuple[str, str, str], sql: str) -> None:
+    if SQL_GENERATOR_CACHE_SIZE <= 0:
+        return
+    with _sql_cache_lock:
+        _sql_cache[key] = sql
+        _sql_cache.move_to_end(key)
+        while len(_sql_cache) > SQL_GENERATOR_CACHE_SIZE:
+            _sql_cache.popitem(last=False)
+
+
+_shared_generator: Optional[SQLGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def get_shared_generator() -> SQLGenerator:
+    """Return the process-wide SQLGenerator, constructing it on first use."""
+    global _shared_generator
+    if _shared_generator is None:
+        with _generator_lock:
+            if _shared_generator is None:
+                _shared_generator = SQLGenerator()
+    return _shared_generator
 
 
 def generate_sql(query: str) -> str:
     """Generate SQL from natural language query."""
-    generator = SQLGenerator()
-    return generator.generate(query)
+    return get_shared_generator().generate(query)
 
 
 if __name__ == "__main__":
@@ -263,9 +617,8 @@ if __name__ == "__main__":
     print("SQL GENERATOR TEST")
     print("=" * 70)
 
-    for query in test_queries:
+    for query, sql in zip(test_queries, generator.generate_many(test_queries)):
         print(f"\nQuery: {query}")
         print("-" * 50)
-        sql = generator.generate(query)
         print(f"SQL:\n{sql}")
         print()
@@ -9,16 +9,20 @@ import logging
 import os
 import re
 import base64
+import copy
+import itertools
 import threading
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Generator, List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
 from azure.search.documents.models import VectorizedQuery
@@ -48,6 +52,8 @@ from shared_utils import (
     FABRIC_SQL_DELAY_TRIGGERS,
     env_bool as _env_bool,
     env_csv as _env_csv,
+    json_dumps_bytes,
+    json_loads,
     matches_any,
 )
 
@@ -92,6 +98,20 @@ AZURE_COSMOS_KEY = os.getenv("AZURE_COSMOS_KEY", "").strip()
 AZURE_COSMOS_DATABASE = os.getenv("AZURE_COSMOS_DATABASE", "aviationrag").strip()
 AZURE_COSMOS_CONTAINER = os.getenv("AZURE_COSMOS_CONTAINER", "notams").strip()
 
+# Rows pulled per fetchmany() when scanning the catalog, so large schemas are
+# grouped incrementally instead of materialised in one list.
+SCHEMA_FETCH_BATCH_SIZE = 500
+
+
+def _iter_fetchmany(cur: Any, size: int) -> Generator[Tuple, None, None]:
+    cur.arraysize = size
+    while True:
+        batch = cur.fetchmany(size)
+        if not batch:
+            return
+        yield from batch
+
+
 _SQL_RESERVED_WORDS = {
     "as", "and", "or", "on", "where", "group", "order", "by", "limit", "offset",
     "join", "left", "right", "inner", "outer", "full", "cross", "having",
@@ -133,6 +153,46 @@ def _env_float(name: str, default: float, minimum: float = 0.0) -> float:
     return max(minimum, value)
 
 
+# Knobs consulted on every request are read once; the environment is fixed
+# after startup.
+SEMANTIC_ROUTE_INDEXES = tuple(s.upper() for s in _env_csv("SEMANTIC_ROUTE_INDEXES", "VECTOR_OPS,VECTOR_REG"))
+FABRIC_SQL_TDS_CONNECT_TIMEOUT_SECONDS = _env_int("FABRIC_SQL_TDS_CONNECT_TIMEOUT_SECONDS", 10, minimum=1)
+FABRIC_SQL_TDS_QUERY_TIMEOUT_SECONDS = _env_int("FABRIC_SQL_TDS_QUERY_TIMEOUT_SECONDS", 15, minimum=1)
+USE_LEGACY_SQL_GENERATOR = _env_bool("USE_LEGACY_SQL_GENERATOR", False)
+SPECULATIVE_SQL_ROUTING = _env_bool("SPECULATIVE_SQL_ROUTING", False)
+SQL_SCHEMA_CACHE_TTL_SECONDS = _env_float("SQL_SCHEMA_CACHE_TTL_SECONDS", 300.0)
+EMBEDDING_CACHE_SIZE = _env_int("EMBEDDING_CACHE_SIZE", 256)
+# SQL generation started alongside LLM routing runs on one shared pool; the
+# route handlers wait at most SQL_RESULT_TIMEOUT_SECONDS for it.
+SQL_RESULT_TIMEOUT_SECONDS = 30.0
+_speculative_sql_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-sql")
+GRAPH_TIMEOUT_SECONDS = _env_float("GRAPH_TIMEOUT_SECONDS", 12.0, minimum=1.0)
+GRAPH_MAX_RETRIES = _env_int("GRAPH_MAX_RETRIES", 2, minimum=0)
+GRAPH_RETRY_BACKOFF_SECONDS = _env_float("GRAPH_RETRY_BACKOFF_SECONDS", 0.75, minimum=0.0)
+GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD = _env_int("GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD", 4, minimum=1)
+GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS = _env_float("GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS", 45.0, minimum=1.0)
+
+
+@lru_cache(maxsize=1)
+def _detect_vector_k_param() -> str:
+    """Handle azure-search-documents SDK drift (k vs k_nearest_neighbors).
+
+    The installed SDK cannot change within a process, so the signature is
+    inspected once rather than per retriever.
+    """
+    try:
+        import inspect
+
+        params = inspect.signature(VectorizedQuery.__init__).parameters
+        if "k" in params:
+            return "k"
+        if "k_nearest_neighbors" in params:
+            return "k_nearest_neighbors"
+    except Exception:
+        pass
+    return "k_nearest_neighbors"
+
+
 def _get_fabric_bearer_token() -> str:
     """Re-read bearer token from env on each call so rotated tokens take effect."""
     return os.getenv("FABRIC_BEARER_TOKEN", "")
@@ -151,6 +211,31 @@ _IN_CLAUSE_LITERALS_RE = re.compile(
 )
 _SINGLE_QUOTED_RE = re.compile(r"'([^']*)'")
 
+# Per-query entity extraction (see _query_tokens / _extract_airports_from_query).
+_QUERY_TOKEN_RE = re.compile(r"[A-Za-z0-9]{3,8}")
+_ICAO_CODE_RE = re.compile(r"\b[A-Z]{4}\b")
+_IATA_CODE_RE = re.compile(r"\b[A-Z]{3}\b")
+
+# SQL/KQL guardrail patterns, applied to every generated query.
+_SQL_CTE_NAME_RE = re.compile(r"\bWITH\s+([A-Za-z_][A-Za-z0-9_]*)\s+AS\b", re.IGNORECASE)
+_SQL_CHAINED_CTE_NAME_RE = re.compile(r",\s*([A-Za-z_][A-Za-z0-9_]*)\s+AS\s*\(", re.IGNORECASE)
+_SQL_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_\.]*)", re.IGNORECASE)
+_SQL_SELECT_OR_WITH_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_SQL_BLOCKED_RE = re.compile(
+    r"\b(DELETE|DROP|ALTER|CREATE|INSERT|UPDATE|EXEC|EXECUTE|TRUNCATE|GRANT|REVOKE|MERGE)\b",
+    re.IGNORECASE,
+)
+_SQL_DOLLAR_QUOTED_RE = re.compile(r"\$([a-zA-Z_]\w*)?\$.*?\$\1\$", re.DOTALL)
+_DOUBLE_QUOTED_RE = re.compile(r'"[^"]*"')
+_KQL_BLOCKED_RE = re.compile(r"\b(drop|delete|create|alter|ingest)\b", re.IGNORECASE)
+_KQL_LET_BINDING_RE = re.compile(r"\blet\s+\w+\s*=\s*[^;]*;")
+_KQL_TIME_NOW_RE = re.compile(r"\btime_now\s*\(", re.IGNORECASE)
+_KQL_MANAGEMENT_COMMAND_RE = re.compile(
+    r"\.\s*(show|set|append|move|rename|replace|enable|disable)\b", re.IGNORECASE
+)
+_KQL_AGO_RE = re.compile(r"\bago\s*\(", re.IGNORECASE)
+_KQL_BETWEEN_DATETIME_RE = re.compile(r"\bbetween\b.*\bdatetime\b", re.IGNORECASE)
+
 
 def _contains_hallucinated_airport_codes(sql: str, provided_airports: List[str]) -> bool:
     """Detect if generated SQL contains airport-like codes not in the provided entities.
@@ -176,6 +261,49 @@ def _contains_hallucinated_airport_codes(sql: str, provided_airports: List[str])
 _fabric_token_lock = threading.Lock()
 _fabric_token_cache: Dict[str, Dict[str, Any]] = {}  # scope -> {token, expires_at}
 
+# Warm the SQL schema cache and Fabric HTTP pool in the background at startup.
+RETRIEVER_WARMUP_ENABLED = _env_bool("RETRIEVER_WARMUP_ENABLED", True)
+# Opt-in cache of whole answer() results for repeated questions, keyed on the
+# whitespace-collapsed query and routing mode.  Off by default because KQL
+# sources are live; keep the TTL below the freshest SLA when enabling it.
+ANSWER_CACHE_TTL_SECONDS = _env_float("ANSWER_CACHE_TTL_SECONDS", 0.0)
+ANSWER_CACHE_SIZE = _env_int("ANSWER_CACHE_SIZE", 512, minimum=1)
+_answer_cache: "OrderedDict[Tuple[str, bool], Tuple[float, Any]]" = OrderedDict()
+_answer_cache_lock = threading.Lock()
+_SYNTHESIS_UNAVAILABLE_ANSWER = (
+    "I'm unable to generate a response right now due to a temporary service issue. Please try again shortly."
+)
+
+# Reuse window for fabric_preflight reports; 0 re-probes on every call.
+FABRIC_PREFLIGHT_CACHE_SECONDS = _env_float("FABRIC_PREFLIGHT_CACHE_SECONDS", 30.0)
+_preflight_lock = threading.Lock()
+
+# One keep-alive pool for Fabric REST calls (KQL, NOSQL, GQL, preflight
+# probes) so each request reuses a warm TCP+TLS connection.
+FABRIC_HTTP_MAX_CONNECTIONS = _env_int("FABRIC_HTTP_MAX_CONNECTIONS", 32, minimum=1)
+_fabric_http_lock = threading.Lock()
+_fabric_http: Any = None
+
+
+def _fabric_http_client() -> Any:
+    """Return the process-wide ``httpx.Client`` used for Fabric REST calls."""
+    global _fabric_http
+    if _fabric_http is None:
+        with _fabric_http_lock:
+            if _fabric_http is None:
+                import httpx
+
+                _fabric_http = httpx.Client(
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=FABRIC_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=FABRIC_HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=60.0,
+                    ),
+                )
+    return _fabric_http
+
+
 _fabric_dac_lock = threading.Lock()
 _FABRIC_DAC_UNSET = object()  # sentinel distinguishing "not yet tried" from "tried and failed"
 _fabric_dac: Any = _FABRIC_DAC_UNSET
@@ -663,23 +791,25 @@ class UnifiedRetriever:
         self.sql_dialect = "postgres"
 
         # Specialized components
-        self.router = QueryRouter()
-        self.sql_generator = SQLGenerator()
+        self.router = QueryRouter(embed_fn=self.get_embedding)
+        self.sql_generator = SQLGenerator(embed_fn=self.get_embedding)
         self.sql_writer = SQLWriter(
             model=os.getenv("AZURE_OPENAI_WORKER_DEPLOYMENT_NAME") or self.llm_deployment
         )
-        self.use_legacy_sql_generator = _env_bool("USE_LEGACY_SQL_GENERATOR", False)
-        self._vector_k_param = self._detect_vector_k_param()
+        self.use_legacy_sql_generator = USE_LEGACY_SQL_GENERATOR
+        # Start SQL generation alongside LLM routing when heuristics don't rule
+        # SQL out, so SQL/HYBRID answers don't wait on two sequential LLM calls.
+        self.speculative_sql_routing = SPECULATIVE_SQL_ROUTING
+        self._vector_k_param = _detect_vector_k_param()
 
         # Schema cache (avoids repeated DB introspection within TTL)
         self._schema_cache: Optional[Dict[str, Any]] = None
         self._schema_cache_expires_at: float = 0.0
-        self._schema_cache_ttl: float = float(os.getenv("SQL_SCHEMA_CACHE_TTL_SECONDS", "300"))
+        self._schema_cache_ttl: float = SQL_SCHEMA_CACHE_TTL_SECONDS
 
         # Embedding cache (LRU)
-        self._embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "256"))
-        self._embedding_cache: Dict[str, List[float]] = {}
-        self._embedding_cache_order: List[str] = []
+        self._embedding_cache_size = EMBEDDING_CACHE_SIZE
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
         self._embedding_cache_lock = threading.Lock()
 
         # PII filter
@@ -737,11 +867,11 @@ class UnifiedRetriever:
             logger.warning("azure-cosmos SDK not installed; Cosmos NOSQL retrieval unavailable")
 
         # Graph retrieval resilience controls.
-        self._graph_timeout_seconds = _env_float("GRAPH_TIMEOUT_SECONDS", 12.0, minimum=1.0)
-        self._graph_max_retries = _env_int("GRAPH_MAX_RETRIES", 2, minimum=0)
-        self._graph_retry_backoff_seconds = _env_float("GRAPH_RETRY_BACKOFF_SECONDS", 0.75, minimum=0.0)
-        self._graph_cb_fail_threshold = _env_int("GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD", 4, minimum=1)
-        self._graph_cb_open_seconds = _env_float("GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS", 45.0, minimum=1.0)
+        self._graph_timeout_seconds = GRAPH_TIMEOUT_SECONDS
+        self._graph_max_retries = GRAPH_MAX_RETRIES
+        self._graph_retry_backoff_seconds = GRAPH_RETRY_BACKOFF_SECONDS
+        self._graph_cb_fail_threshold = GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD
+        self._graph_cb_open_seconds = GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS
         self._graph_circuit_lock = threading.Lock()
         self._graph_circuit_failures = 0
         self._graph_circuit_open_until = 0.0
@@ -752,6 +882,27 @@ class UnifiedRetriever:
         self._identity_guardrail_report: Dict[str, Any] = {}
         self._refresh_source_capabilities(refresh_tds=True)
 
+        if RETRIEVER_WARMUP_ENABLED:
+            threading.Thread(target=self._warm_caches, name="retriever-warmup", daemon=True).start()
+
+    def _warm_caches(self) -> None:
+        """Fill per-process caches the first query would otherwise pay for.
+
+        Runs on a daemon thread after construction: the SQL schema snapshot
+        (every generated query is validated against it) and the pooled Fabric
+        HTTP client.  Failures only mean the first query fills them instead.
+        """
+        _t0 = time.perf_counter()
+        try:
+            if self.sql_available:
+                self.cached_sql_schema()
+            if any(self._effective_fabric_endpoint(s) for s in ("KQL", "GRAPH", "NOSQL")):
+                _fabric_http_client()
+        except Exception as exc:
+            logger.warning("Retriever cache warm-up failed: %s", exc)
+            return
+        logger.info("perf stage=%s ms=%.1f", "retriever_warmup", (time.perf_counter() - _t0) * 1000)
+
     @staticmethod
     def _filter_error_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove error/error_code rows from result lists before synthesis."""
@@ -770,31 +921,17 @@ class UnifiedRetriever:
             lines.append(f"{qualified}: {', '.join(columns)}")
         return "\n".join(lines)
 
-    def _detect_vector_k_param(self) -> str:
-        """Handle azure-search-documents SDK drift (k vs k_nearest_neighbors)."""
-        try:
-            import inspect
-
-            params = inspect.signature(VectorizedQuery.__init__).parameters
-            if "k" in params:
-                return "k"
-            if "k_nearest_neighbors" in params:
-                return "k_nearest_neighbors"
-        except Exception:
-            pass
-        return "k_nearest_neighbors"
-
     def get_embedding(self, text: str) -> List[float]:
         """Get embedding from Azure OpenAI with LRU cache."""
         if not isinstance(text, str):
             raise TypeError(f"embedding_input_must_be_string:{type(text).__name__}")
         normalized = text.strip()[:8000]
         with self._embedding_cache_lock:
-            if normalized in self._embedding_cache:
-                self._embedding_cache_order.remove(normalized)
-                self._embedding_cache_order.append(normalized)
+            cached = self._embedding_cache.get(normalized)
+            if cached is not None:
+                self._embedding_cache.move_to_end(normalized)
                 logger.info("perf stage=%s cache=hit", "get_embedding")
-                return self._embedding_cache[normalized]
+                return cached
 
         _t0 = time.perf_counter()
         response = self.llm.embeddings.create(
@@ -806,10 +943,9 @@ class UnifiedRetriever:
 
         with self._embedding_cache_lock:
             self._embedding_cache[normalized] = result
-            self._embedding_cache_order.append(normalized)
-            while len(self._embedding_cache_order) > self._embedding_cache_size:
-                evicted = self._embedding_cache_order.pop(0)
-                self._embedding_cache.pop(evicted, None)
+            self._embedding_cache.move_to_end(normalized)
+            while len(self._embedding_cache) > self._embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
 
         logger.info("perf stage=%s cache=miss ms=%.1f", "get_embedding", elapsed)
         return result
@@ -832,20 +968,24 @@ class UnifiedRetriever:
         token_scope: str = None,
         timeout_seconds: float = 30.0,
     ) -> Any:
-        body = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(endpoint, data=body, method="POST")
-        req.add_header("Content-Type", "application/json")
+        body = json_dumps_bytes(payload)
+        headers = {"Content-Type": "application/json"}
         token = _acquire_fabric_token(token_scope) if token_scope else _acquire_fabric_token()
         if token:
-            req.add_header("Authorization", f"Bearer {token}")
+            headers["Authorization"] = f"Bearer {token}"
         try:
-            with urllib.request.urlopen(req, timeout=max(1.0, float(timeout_seconds))) as resp:
-                raw = resp.read().decode("utf-8", errors="ignore")
-                if not raw:
-                    return {}
-                return json.loads(raw)
-        except urllib.error.HTTPError as exc:
-            return {"error": f"http_{exc.code}", "detail": exc.read().decode("utf-8", errors="ignore")}
+            resp = _fabric_http_client().post(
+                endpoint,
+                content=body,
+                headers=headers,
+                timeout=max(1.0, float(timeout_seconds)),
+            )
+            if resp.status_code >= 400:
+                return {"error": f"http_{resp.status_code}", "detail": resp.content.decode("utf-8", errors="ignore")}
+            if not resp.content.strip():
+                return {}
+            # KQL/NOSQL result sets can be large; parse the bytes directly.
+            return json_loads(resp.content)
         except Exception as exc:
             return {"error": str(exc)}
 
@@ -916,17 +1056,23 @@ class UnifiedRetriever:
                 text = str(query)
         else:
             text = str(query or "")
+        return list(self._query_tokens_from_text(text))
 
-        tokens = [t.upper() for t in re.findall(r"[A-Za-z0-9]{3,8}", text)]
-        deduped: List[str] = []
-        for token in tokens:
-            if token in self._GRAPH_TOKEN_BLOCKLIST:
+    # Token and airport extraction are pure functions of the text and run
+    # several times per request (router, planner, GRAPH/KQL/NOSQL builders),
+    # so results are memoized process-wide.
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _query_tokens_from_text(text: str) -> Tuple[str, ...]:
+        deduped: Dict[str, None] = {}
+        for match in _QUERY_TOKEN_RE.finditer(text):
+            token = match.group().upper()
+            if token in UnifiedRetriever._GRAPH_TOKEN_BLOCKLIST:
                 continue
-            if token not in deduped:
-                deduped.append(token)
+            deduped[token] = None
             if len(deduped) >= 8:
                 break
-        return deduped
+        return tuple(deduped)
 
     def _extract_airports_from_query(self, query: str) -> List[str]:
         if isinstance(query, str):
@@ -938,29 +1084,32 @@ class UnifiedRetriever:
                 text = str(query)
         else:
             text = str(query or "")
-        upper = text.upper()
+        return list(self._airports_from_text(text))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _airports_from_text(text: str) -> Tuple[str, ...]:
         lower = text.lower()
-        out: List[str] = []
+        # Insertion-ordered set.
+        out: Dict[str, None] = {}
 
         # ICAO codes in free text (case-sensitive to avoid matching regular words).
-        for match in re.findall(r"\b[A-Z]{4}\b", text):
-            if match not in out and match not in _ENGLISH_4LETTER_BLOCKLIST:
-                out.append(match)
+        for match in _ICAO_CODE_RE.findall(text):
+            if match not in _ENGLISH_4LETTER_BLOCKLIST:
+                out[match] = None
 
         # Common IATA references used by users in natural language.
-        for match in re.findall(r"\b[A-Z]{3}\b", upper):
+        for match in _IATA_CODE_RE.findall(text.upper()):
             icao = IATA_TO_ICAO_MAP.get(match)
-            if icao and icao not in out:
-                out.append(icao)
+            if icao:
+                out[icao] = None
 
         # City-level shortcuts for common demo routes.
         for city, airports in CITY_AIRPORT_MAP.items():
             if city in lower:
-                for airport in airports:
-                    if airport not in out:
-                        out.append(airport)
+                out.update(dict.fromkeys(airports))
 
-        return out[:8]
+        return tuple(itertools.islice(out, 8))
 
     def _extract_airports_from_sql(self, sql_query: str) -> List[str]:
         if not sql_query:
@@ -1222,15 +1371,15 @@ class UnifiedRetriever:
     def _ensure_graph_runtime_state(self) -> None:
         """Lazily initialize graph runtime controls for partially constructed test objects."""
         if not hasattr(self, "_graph_timeout_seconds"):
-            self._graph_timeout_seconds = _env_float("GRAPH_TIMEOUT_SECONDS", 12.0, minimum=1.0)
+            self._graph_timeout_seconds = GRAPH_TIMEOUT_SECONDS
         if not hasattr(self, "_graph_max_retries"):
-            self._graph_max_retries = _env_int("GRAPH_MAX_RETRIES", 2, minimum=0)
+            self._graph_max_retries = GRAPH_MAX_RETRIES
         if not hasattr(self, "_graph_retry_backoff_seconds"):
-            self._graph_retry_backoff_seconds = _env_float("GRAPH_RETRY_BACKOFF_SECONDS", 0.75, minimum=0.0)
+            self._graph_retry_backoff_seconds = GRAPH_RETRY_BACKOFF_SECONDS
         if not hasattr(self, "_graph_cb_fail_threshold"):
-            self._graph_cb_fail_threshold = _env_int("GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD", 4, minimum=1)
+            self._graph_cb_fail_threshold = GRAPH_CIRCUIT_BREAKER_FAIL_THRESHOLD
         if not hasattr(self, "_graph_cb_open_seconds"):
-            self._graph_cb_open_seconds = _env_float("GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS", 45.0, minimum=1.0)
+            self._graph_cb_open_seconds = GRAPH_CIRCUIT_BREAKER_OPEN_SECONDS
         if not hasattr(self, "_graph_circuit_lock") or self._graph_circuit_lock is None:
             self._graph_circuit_lock = threading.Lock()
         if not hasattr(self, "_graph_circuit_failures"):
@@ -1571,30 +1720,25 @@ class UnifiedRetriever:
                 break
 
             try:
-                req = urllib.request.Request(
+                resp = _fabric_http_client().post(
                     url,
-                    data=json.dumps({"query": gql}).encode("utf-8"),
+                    content=json_dumps_bytes({"query": gql}),
                     headers={
                         "Authorization": f"Bearer {fabric_token}",
                         "Content-Type": "application/json",
                         "Accept": "application/json",
                     },
-                    method="POST",
+                    timeout=self._graph_timeout_seconds,
                 )
-                with urllib.request.urlopen(req, timeout=self._graph_timeout_seconds) as resp:
-                    body = json.loads(resp.read().decode("utf-8"))
-            except urllib.error.HTTPError as e:
-                error_body = ""
-                try:
-                    error_body = e.read().decode("utf-8")[:500]
-                except Exception:
-                    pass
-                last_error = f"gql_http_{e.code}_{e.reason}_{error_body}"
-                logger.warning("GQL query HTTP %d: %s %s", e.code, e.reason, error_body[:200])
-                if attempt < max_attempts and self._graph_retryable_error(last_error):
-                    self._graph_retry_sleep(attempt)
-                    continue
-                break
+                if resp.status_code >= 400:
+                    error_body = resp.content.decode("utf-8", errors="ignore")[:500]
+                    last_error = f"gql_http_{resp.status_code}_{resp.reason_phrase}_{error_body}"
+                    logger.warning("GQL query HTTP %d: %s %s", resp.status_code, resp.reason_phrase, error_body[:200])
+                    if attempt < max_attempts and self._graph_retryable_error(last_error):
+                        self._graph_retry_sleep(attempt)
+                        continue
+                    break
+                body = json_loads(resp.content)
             except Exception as e:
                 last_error = f"gql_request_error_{e}"
                 logger.warning("GQL query error: %s", e)
@@ -2422,11 +2566,11 @@ class UnifiedRetriever:
                 "token_ttl_seconds": None,
             }
 
-        req = urllib.request.Request(endpoint, method="GET")
+        headers: Dict[str, str] = {}
         token_bundle = self._fabric_auth_bundle_for_endpoint(endpoint)
         token = str(token_bundle.get("token") or "")
         if token:
-            req.add_header("Authorization", f"Bearer {token}")
+            headers["Authorization"] = f"Bearer {token}"
         def _probe_auth_fields() -> Dict[str, Any]:
             fields: Dict[str, Any] = {
                 "auth_mode": str(token_bundle.get("auth_mode") or "none"),
@@ -2440,33 +2584,53 @@ class UnifiedRetriever:
             return fields
 
         try:
-            with urllib.request.urlopen(req, timeout=timeout_seconds) as resp:
-                return {
-                    "status": "pass",
-                    "detail": f"reachable_http_{resp.status}",
-                    **_probe_auth_fields(),
-                }
-        except urllib.error.HTTPError as exc:
-            # Treat auth and method errors as reachable endpoint.
-            if exc.code in (400, 401, 403, 404, 405):
-                return {
-                    "status": "warn",
-                    "detail": f"reachable_http_{exc.code}",
-                    **_probe_auth_fields(),
-                }
+            resp = _fabric_http_client().get(endpoint, headers=headers, timeout=timeout_seconds)
+        except Exception as exc:
             return {
                 "status": "fail",
-                "detail": f"http_{exc.code}",
+                "detail": str(exc),
                 **_probe_auth_fields(),
             }
-        except Exception as exc:
+        if resp.status_code < 400:
             return {
-                "status": "fail",
-                "detail": str(exc),
+                "status": "pass",
+                "detail": f"reachable_http_{resp.status_code}",
+                **_probe_auth_fields(),
+            }
+        # Treat auth and method errors as reachable endpoint.
+        if resp.status_code in (400, 401, 403, 404, 405):
+            return {
+                "status": "warn",
+                "detail": f"reachable_http_{resp.status_code}",
                 **_probe_auth_fields(),
             }
+        return {
+            "status": "fail",
+            "detail": f"http_{resp.status_code}",
+            **_probe_auth_fields(),
+        }
+
+    def fabric_preflight(self, refresh: bool = False) -> Dict[str, Any]:
+        """Run (or reuse) the Fabric readiness checks.
 
-    def fabric_preflight(self) -> Dict[str, Any]:
+        Every run probes each configured endpoint over HTTP and refreshes the
+        TDS capability, so bursts of health checks within
+        FABRIC_PREFLIGHT_CACHE_SECONDS share one report.  ``refresh=True``
+        forces a new run.
+        """
+        ttl = FABRIC_PREFLIGHT_CACHE_SECONDS
+        cached = getattr(self, "_preflight_cache", None)
+        if not refresh and ttl > 0 and cached is not None and time.monotonic() - cached[0] < ttl:
+            return dict(cached[1])
+        with _preflight_lock:
+            cached = getattr(self, "_preflight_cache", None)
+            if not refresh and ttl > 0 and cached is not None and time.monotonic() - cached[0] < ttl:
+                return dict(cached[1])
+            payload = self._run_fabric_preflight()
+            self._preflight_cache = (time.monotonic(), payload)
+            return dict(payload)
+
+    def _run_fabric_preflight(self) -> Dict[str, Any]:
         self._refresh_source_capabilities(refresh_tds=True)
         identity_report = dict(getattr(self, "_identity_guardrail_report", {}) or {})
         source_capabilities = self.source_capabilities(refresh=False)
@@ -2742,9 +2906,10 @@ class UnifiedRetriever:
     def _get_pg_connection(self, read_only: bool = False) -> Any:
         """Acquire a connection from the PostgreSQL pool.
 
-        When *read_only* is ``True`` the connection is returned with
-        ``autocommit = False`` so callers can wrap SQL in a
-        ``SET TRANSACTION READ ONLY`` block.
+        When *read_only* is ``True`` the connection is returned in a
+        read-only session with ``autocommit = False``: psycopg2 then opens
+        each transaction with ``BEGIN READ ONLY``, so callers get the
+        read-only guarantee without a separate ``SET TRANSACTION`` round trip.
         """
         if self._pg_pool is None:
             return None
@@ -2752,7 +2917,13 @@ class UnifiedRetriever:
             conn = self._pg_pool.getconn()
             if read_only:
                 conn.autocommit = False
+                conn.readonly = True
             else:
+                if conn.readonly:
+                    # Reset while autocommit is off so psycopg2 does not send
+                    # SET default_transaction_read_only to the server.
+                    conn.autocommit = False
+                    conn.readonly = None
                 conn.autocommit = True
             return conn
         except Exception as exc:
@@ -2791,28 +2962,24 @@ class UnifiedRetriever:
         try:
             cur = conn.cursor()
             visible_schemas = self.sql_visible_schemas or ["public"]
+            # One round-trip for every visible table and its columns; the LEFT
+            # JOIN keeps column-less tables in the snapshot.
             cur.execute(
                 """
-                SELECT table_schema, table_name
-                FROM information_schema.tables
-                WHERE table_type='BASE TABLE'
-                  AND table_schema = ANY(%s)
-                ORDER BY table_schema, table_name
+                SELECT t.table_schema, t.table_name, c.column_name, c.data_type
+                FROM information_schema.tables t
+                LEFT JOIN information_schema.columns c
+                  ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+                WHERE t.table_type='BASE TABLE'
+                  AND t.table_schema = ANY(%s)
+                ORDER BY t.table_schema, t.table_name, c.ordinal_position
                 """,
                 (visible_schemas,),
             )
-            table_rows = [(str(row[0]), str(row[1])) for row in cur.fetchall()]
-            for schema_name, table in table_rows:
-                cur.execute(
-                    """
-                    SELECT column_name, data_type
-                    FROM information_schema.columns
-                    WHERE table_schema=%s AND table_name=%s
-                    ORDER BY ordinal_position
-                    """,
-                    (schema_name, table),
-                )
-                cols = [{"name": str(r[0]), "type": str(r[1])} for r in cur.fetchall()]
+            for (schema_name, table), rows in itertools.groupby(
+                _iter_fetchmany(cur, SCHEMA_FETCH_BATCH_SIZE), key=lambda r: (str(r[0]), str(r[1]))
+            ):
+                cols = [{"name": str(r[2]), "type": str(r[3])} for r in rows if r[2] is not None]
                 tables.append({"schema": schema_name, "table": table, "columns": cols})
             cur.close()
         except Exception as exc:
@@ -2834,33 +3001,70 @@ class UnifiedRetriever:
         logger.info("perf stage=%s ms=%.1f", "current_sql_schema", (time.perf_counter() - _t0_schema) * 1000)
         return result
 
+    def sql_schema_fingerprint(self) -> Optional[str]:
+        """Return a digest of the visible catalog, or None when unavailable.
+
+        A single-row query, so callers can confirm a cached schema is still
+        current without re-reading every table and column.
+        """
+        if not self.sql_available:
+            return None
+        conn = self._get_pg_connection()
+        if conn is None:
+            return None
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT md5(string_agg(
+                    table_schema || '.' || table_name || '.' || column_name || ':' || data_type,
+                    ',' ORDER BY table_schema, table_name, ordinal_position
+                ))
+                FROM information_schema.columns
+                WHERE table_schema = ANY(%s)
+                """,
+                (self.sql_visible_schemas or ["public"],),
+            )
+            row = cur.fetchone()
+            cur.close()
+        except Exception as exc:
+            logger.debug("SQL schema fingerprint unavailable: %s", exc)
+            return None
+        finally:
+            self._put_pg_connection(conn)
+        return str(row[0]) if row and row[0] else None
+
     def cached_sql_schema(self) -> Dict[str, Any]:
         """Return SQL schema from cache if fresh, otherwise refresh from DB."""
         now = time.perf_counter()
         if self._schema_cache is not None and now < self._schema_cache_expires_at:
             return self._schema_cache
         schema = self.current_sql_schema()
-        self._schema_cache = schema
-        self._schema_cache_expires_at = now + self._schema_cache_ttl
+        # A failed collection is retried on the next call rather than pinned
+        # for the whole TTL.
+        if not schema.get("error"):
+            self._schema_cache = schema
+            self._schema_cache_expires_at = now + self._schema_cache_ttl
         return schema
 
+    def invalidate_schema_cache(self) -> None:
+        """Drop the cached SQL schema so the next lookup re-reads the catalog."""
+        self._schema_cache = None
+        self._schema_cache_expires_at = 0.0
+
     def _detect_sql_tables(self, sql_query: str) -> List[str]:
         # Collect CTE names defined by WITH ... AS so they can be excluded.
         cte_names = {
             m.lower()
-            for m in re.findall(
-                r"\bWITH\s+([A-Za-z_][A-Za-z0-9_]*)\s+AS\b", sql_query, flags=re.IGNORECASE
-            )
+            for m in _SQL_CTE_NAME_RE.findall(sql_query)
         }
         # Also handle comma-separated CTEs: WITH a AS (...), b AS (...)
         cte_names.update(
             m.lower()
-            for m in re.findall(
-                r",\s*([A-Za-z_][A-Za-z0-9_]*)\s+AS\s*\(", sql_query, flags=re.IGNORECASE
-            )
+            for m in _SQL_CHAINED_CTE_NAME_RE.findall(sql_query)
         )
 
-        table_tokens = re.findall(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_\.]*)", sql_query, flags=re.IGNORECASE)
+        table_tokens = _SQL_TABLE_REF_RE.findall(sql_query)
         cleaned: List[str] = []
         for token in table_tokens:
             table = token.strip().strip('"').strip("`")
@@ -3019,24 +3223,22 @@ class UnifiedRetriever:
         sql = (sql_query or "").strip()
         if not sql:
             return {"code": "sql_validation_failed", "detail": "empty_sql_query"}
-        if not re.match(r"^\s*(SELECT|WITH)\b", sql, flags=re.IGNORECASE):
+        if not _SQL_SELECT_OR_WITH_RE.match(sql):
             return {"code": "sql_validation_failed", "detail": "only_select_or_with_queries_are_allowed"}
 
         # Block mutating / DDL keywords anywhere in the query.
-        _sql_blocked_patterns = (
-            r"\bDELETE\b", r"\bDROP\b", r"\bALTER\b", r"\bCREATE\b",
-            r"\bINSERT\b", r"\bUPDATE\b", r"\bEXEC\b", r"\bEXECUTE\b",
-            r"\bTRUNCATE\b", r"\bGRANT\b", r"\bREVOKE\b", r"\bMERGE\b",
-        )
-        for pattern in _sql_blocked_patterns:
-            if re.search(pattern, sql, flags=re.IGNORECASE):
-                return {"code": "sql_validation_failed", "detail": f"sql_contains_blocked_operation: {pattern}"}
+        blocked = _SQL_BLOCKED_RE.search(sql)
+        if blocked:
+            return {
+                "code": "sql_validation_failed",
+                "detail": f"sql_contains_blocked_operation: {blocked.group(1).upper()}",
+            }
 
         # Check for semicolons outside of string literals to prevent multi-statement injection.
         # A single trailing semicolon is a valid SQL terminator, so strip it first.
-        stripped = re.sub(r'\$([a-zA-Z_]\w*)?\$.*?\$\1\$', '', sql, flags=re.DOTALL)
-        stripped = re.sub(r'"[^"]*"', '', stripped)
-        stripped = re.sub(r"'[^']*'", '', stripped)
+        stripped = _SQL_DOLLAR_QUOTED_RE.sub("", sql)
+        stripped = _DOUBLE_QUOTED_RE.sub("", stripped)
+        stripped = _SINGLE_QUOTED_RE.sub("", stripped)
         stripped = stripped.rstrip().rstrip(";")
         if ";" in stripped:
             return {"code": "sql_validation_failed", "detail": "sql_multiple_statements_not_allowed"}
@@ -3087,7 +3289,6 @@ class UnifiedRetriever:
             return [self._source_unavailable_row("SQL", "pg_pool_connection_unavailable")], []
         try:
             cur = conn.cursor()
-            cur.execute("SET TRANSACTION READ ONLY")
             cur.execute(sql_query)
             rows = cur.fetchall()
             columns = [desc[0] for desc in cur.description] if cur.description else []
@@ -3654,17 +3855,26 @@ class UnifiedRetriever:
         source_list = sources or ["VECTOR_OPS"]
         embedding = self.get_embedding(query)
 
-        merged_rows: List[Dict[str, Any]] = []
-        merged_citations: List[Citation] = []
-        for source in source_list:
-            source_filter = (filters or {}).get(source)
-            rows, cites = self.query_semantic(
+        def _search(source: str) -> Tuple[List[Dict], List[Citation]]:
+            return self.query_semantic(
                 query,
                 top=top_per_source,
                 embedding=embedding,
                 source=source,
-                filter_expression=source_filter,
+                filter_expression=(filters or {}).get(source),
             )
+
+        # One search round trip per index; run them concurrently so latency
+        # is the slowest index rather than the sum (results keep source order).
+        if len(source_list) > 1:
+            with ThreadPoolExecutor(max_workers=len(source_list), thread_name_prefix="semantic-multi") as executor:
+                per_source = list(executor.map(_search, source_list))
+        else:
+            per_source = [_search(source) for source in source_list]
+
+        merged_rows: List[Dict[str, Any]] = []
+        merged_citations: List[Citation] = []
+        for rows, cites in per_source:
             merged_rows.extend(rows)
             merged_citations.extend(cites)
 
@@ -3831,29 +4041,22 @@ class UnifiedRetriever:
         text = (csl or "").strip()
         if not text:
             return "empty_kql_query"
-        blocked_patterns = (
-            r"\bdrop\b",
-            r"\bdelete\b",
-            r"\bcreate\b",
-            r"\balter\b",
-            r"\bingest\b",
-        )
-        for pattern in blocked_patterns:
-            if re.search(pattern, text, flags=re.IGNORECASE):
-                return f"kql_contains_blocked_operation:{pattern}"
+        blocked = _KQL_BLOCKED_RE.search(text)
+        if blocked:
+            return f"kql_contains_blocked_operation:{blocked.group(1).lower()}"
         # Check for semicolons outside of string literals to prevent multi-statement injection.
         # First strip string literals, then strip legitimate `let <name> = <expr>;` bindings
         # which require semicolons as delimiters in valid KQL.
-        stripped = re.sub(r'"[^"]*"', '', text)
-        stripped = re.sub(r"'[^']*'", '', stripped)
-        stripped = re.sub(r'\blet\s+\w+\s*=\s*[^;]*;', '', stripped)
+        stripped = _DOUBLE_QUOTED_RE.sub("", text)
+        stripped = _SINGLE_QUOTED_RE.sub("", stripped)
+        stripped = _KQL_LET_BINDING_RE.sub("", stripped)
         if ";" in stripped:
             return "kql_multiple_statements_not_allowed"
-        if re.search(r"\btime_now\s*\(", stripped, flags=re.IGNORECASE):
+        if _KQL_TIME_NOW_RE.search(stripped):
             return "kql_unsupported_function:time_now"
         # After stripping let bindings, block Kusto management commands (dot-commands)
         # that could leak info or mutate state (e.g. `.show commands`, `.set-or-replace`).
-        if re.search(r'\.\s*(show|set|append|move|rename|replace|enable|disable)\b', stripped, flags=re.IGNORECASE):
+        if _KQL_MANAGEMENT_COMMAND_RE.search(stripped):
             return "kql_contains_blocked_management_command"
         table_columns = self._kql_table_columns(kql_schema)
         if table_columns:
@@ -3878,22 +4081,25 @@ class UnifiedRetriever:
 
     # Time columns used by known Kusto tables.
     _KQL_TIME_COLUMNS = ("time_position", "valid_time_from", "valid_time_to", "timestamp")
+    _KQL_TIME_COLUMN_RES = tuple(
+        (col, re.compile(rf"\b{col}\b", re.IGNORECASE)) for col in _KQL_TIME_COLUMNS
+    )
 
     def _ensure_kql_window(self, csl: str, window_minutes: int) -> str:
         text = (csl or "").strip()
         if not text:
             return text
         # Already has an explicit time window — don't double-filter.
-        if re.search(r"\bago\s*\(", text, flags=re.IGNORECASE):
+        if _KQL_AGO_RE.search(text):
             return text
-        if re.search(r"\bbetween\b.*\bdatetime\b", text, flags=re.IGNORECASE):
+        if _KQL_BETWEEN_DATETIME_RE.search(text):
             return text
         # Only append a time filter when a known time column appears as a column
         # reference in a pipe expression (not inside a string literal).
-        stripped = re.sub(r'"[^"]*"', '', text)
-        stripped = re.sub(r"'[^']*'", '', stripped)
-        for col in self._KQL_TIME_COLUMNS:
-            if re.search(rf"\b{col}\b", stripped, flags=re.IGNORECASE):
+        stripped = _DOUBLE_QUOTED_RE.sub("", text)
+        stripped = _SINGLE_QUOTED_RE.sub("", stripped)
+        for col, col_re in self._KQL_TIME_COLUMN_RES:
+            if col_re.search(stripped):
                 return f"{text}\n| where {col} > ago({max(1, int(window_minutes))}m)"
         return text
 
@@ -4732,8 +4938,8 @@ class UnifiedRetriever:
                 "sql": sql, "auth_hint": _FABRIC_SQL_AUTH_HINT,
             })], []
 
-        connect_timeout = _env_int("FABRIC_SQL_TDS_CONNECT_TIMEOUT_SECONDS", 10, minimum=1)
-        query_timeout = _env_int("FABRIC_SQL_TDS_QUERY_TIMEOUT_SECONDS", 15, minimum=1)
+        connect_timeout = FABRIC_SQL_TDS_CONNECT_TIMEOUT_SECONDS
+        query_timeout = FABRIC_SQL_TDS_QUERY_TIMEOUT_SECONDS
 
         import pyodbc
         import struct
@@ -4917,9 +5123,21 @@ class UnifiedRetriever:
     # Route Execution Methods
     # =========================================================================
 
-    def execute_sql_route(self, query: str, sql_hint: str = None) -> RetrievalResult:
+    def execute_sql_route(
+        self,
+        query: str,
+        sql_hint: str = None,
+        sql_future: Optional[Future] = None,
+    ) -> RetrievalResult:
         """Execute SQL-only retrieval."""
-        results, sql, citations = self.query_sql(query, sql_hint)
+        if sql_future is not None:
+            try:
+                results, sql, citations = sql_future.result(timeout=SQL_RESULT_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.error("Speculative SQL query error: %s", e)
+                results, sql, citations = [], None, []
+        else:
+            results, sql, citations = self.query_sql(query, sql_hint)
 
         context = {"sql_results": results}
         answer = self._synthesize_answer(query, context, "SQL")
@@ -4935,8 +5153,7 @@ class UnifiedRetriever:
 
     def execute_semantic_route(self, query: str) -> RetrievalResult:
         """Execute semantic-only retrieval (multi-index)."""
-        multi_sources = _env_csv("SEMANTIC_ROUTE_INDEXES", "VECTOR_OPS,VECTOR_REG")
-        valid = [s.upper() for s in multi_sources if s.upper() in self.vector_source_to_index]
+        valid = [s for s in SEMANTIC_ROUTE_INDEXES if s in self.vector_source_to_index]
         if not valid:
             valid = ["VECTOR_OPS"]
         results, citations = self.query_semantic_multi(
@@ -4957,19 +5174,25 @@ class UnifiedRetriever:
             semantic_results=results
         )
 
-    def execute_hybrid_route(self, query: str, sql_hint: str = None) -> RetrievalResult:
+    def execute_hybrid_route(
+        self,
+        query: str,
+        sql_hint: str = None,
+        sql_future: Optional[Future] = None,
+    ) -> RetrievalResult:
         """Execute hybrid retrieval (SQL + Semantic in parallel)."""
-        query_embedding, _embedding_error = self.get_embedding_safe(query)
-
         sql_results, sql_query, sql_citations = [], None, []
         semantic_results, semantic_citations = [], []
 
         with ThreadPoolExecutor(max_workers=2) as executor:
-            sql_future = executor.submit(self.query_sql, query, sql_hint)
-            semantic_future = executor.submit(self.query_semantic, query, 3, query_embedding)
+            if sql_future is None:
+                sql_future = executor.submit(self.query_sql, query, sql_hint)
+            # query_semantic embeds the query itself, so the embedding round
+            # trip overlaps SQL generation instead of preceding it.
+            semantic_future = executor.submit(self.query_semantic, query, 3)
 
             try:
-                sql_results, sql_query, sql_citations = sql_future.result(timeout=30)
+                sql_results, sql_query, sql_citations = sql_future.result(timeout=SQL_RESULT_TIMEOUT_SECONDS)
             except Exception as e:
                 logger.error("SQL query error in parallel execution: %s", e)
 
@@ -5069,10 +5292,19 @@ class UnifiedRetriever:
         Main entry point - route query and return answer with citations.
         All queries are checked for PII before processing.
         """
+        cache_key = (" ".join(str(query or "").split()), bool(use_llm_routing))
+        cached = _cached_answer(cache_key)
+        if cached is not None:
+            logger.info("perf stage=%s cache=hit", "answer")
+            return cached
+
         # Step 0: Check for PII before processing
+        cacheable = ANSWER_CACHE_TTL_SECONDS > 0
         if self.pii_filter:
             pii_result = self.pii_filter.check(query)
             if pii_result.error:
+                # Fail-open results are not cached, so the next ask is re-checked.
+                cacheable = False
                 logger.warning("PII check completed with error (fail-open): %s", pii_result.error)
             if pii_result.has_pii:
                 warning = self.pii_filter.format_warning(pii_result.entities)
@@ -5087,7 +5319,11 @@ class UnifiedRetriever:
                 )
 
         # Route the query
+        sql_future: Optional[Future] = None
         if use_llm_routing:
+            if self.speculative_sql_routing and self.router.quick_route(query) != "SEMANTIC":
+                # A SEMANTIC route simply ignores the future; nothing waits on it.
+                sql_future = _speculative_sql_pool.submit(self.query_sql, query)
             route_result = self.router.route(query)
         else:
             route_result = {
@@ -5097,18 +5333,25 @@ class UnifiedRetriever:
 
         route = route_result.get("route", "HYBRID")
         sql_hint = route_result.get("sql_hint")
+        if sql_hint and sql_future is not None:
+            # The speculative SQL was generated without the router's hint;
+            # regenerate so the hint still shapes the query.
+            sql_future.cancel()
+            sql_future = None
 
         logger.info("Query: %s | Route: %s - %s", query, route, route_result.get("reasoning", ""))
 
         # Execute appropriate route
         if route == "SQL":
-            result = self.execute_sql_route(query, sql_hint)
+            result = self.execute_sql_route(query, sql_hint, sql_future=sql_future)
         elif route == "SEMANTIC":
             result = self.execute_semantic_route(query)
         else:  # HYBRID
-            result = self.execute_hybrid_route(query, sql_hint)
+            result = self.execute_hybrid_route(query, sql_hint, sql_future=sql_future)
 
         result.reasoning = route_result.get("reasoning", result.reasoning)
+        if cacheable and result.answer != _SYNTHESIS_UNAVAILABLE_ANSWER:
+            _store_answer(cache_key, result)
         return result
 
     _ROUTE_INSTRUCTIONS: Dict[str, str] = {
@@ -5166,7 +5409,7 @@ Retrieved Data:
             return response.choices[0].message.content
         except Exception as exc:
             logger.error("LLM synthesis failed: %s", exc)
-            return "I'm unable to generate a response right now due to a temporary service issue. Please try again shortly."
+            return _SYNTHESIS_UNAVAILABLE_ANSWER
 
     def _synthesize_answer_stream(
         self,
@@ -5402,6 +5645,28 @@ _singleton_retriever: Optional[UnifiedRetriever] = None
 _singleton_lock = threading.Lock()
 
 
+def _cached_answer(key: Tuple[str, bool]) -> Optional[RetrievalResult]:
+    if ANSWER_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _answer_cache_lock:
+        entry = _answer_cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= ANSWER_CACHE_TTL_SECONDS:
+            del _answer_cache[key]
+            return None
+        _answer_cache.move_to_end(key)
+        return copy.deepcopy(entry[1])
+
+
+def _store_answer(key: Tuple[str, bool], result: RetrievalResult) -> None:
+    with _answer_cache_lock:
+        _answer_cache[key] = (time.monotonic(), copy.deepcopy(result))
+        _answer_cache.move_to_end(key)
+        while len(_answer_cache) > ANSWER_CACHE_SIZE:
+            _answer_cache.popitem(last=False)
+
+
 def answer_question(query: str, use_llm_routing: bool = True) -> dict:
     """Simple function to get an answer with citations."""
     global _singleton_retriever
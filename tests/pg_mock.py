@@ -104,6 +104,16 @@ class MockCursor:
             self._columns = []
             return
 
+        # information_schema.tables joined to columns (single-pass schema scan)
+        if "information_schema.tables" in sql_lower and "information_schema.columns" in sql_lower:
+            self._columns = ["table_schema", "table_name", "column_name", "data_type"]
+            self._rows = [
+                ("public", name, c["name"], c["type"])
+                for name, cols in TABLE_SCHEMAS.items()
+                for c in cols
+            ]
+            return
+
         # information_schema.tables
         if "information_schema.tables" in sql_lower:
             self._columns = ["table_schema", "table_name"]
@@ -319,6 +329,11 @@ class MockCursor:
     def fetchone(self) -> Optional[Tuple]:
         return self._rows[0] if self._rows else None
 
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        size = size or getattr(self, "arraysize", 1)
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return list(batch)
+
     def close(self) -> None:
         pass
 
@@ -339,6 +354,7 @@ class MockConnection:
 
     def __init__(self, *, empty: bool = False):
         self.autocommit = False
+        self.readonly = None
         self._empty = empty
 
     def cursor(self) -> MockCursor:
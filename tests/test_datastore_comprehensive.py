@@ -75,8 +75,7 @@ def _build_retriever() -> UnifiedRetriever:
     retriever.sql_generator = _Writer()
     retriever.use_legacy_sql_generator = False
     retriever._cosmos_container = None
-    retriever._embedding_cache = {}
-    retriever._embedding_cache_order = []
+    retriever._embedding_cache = __import__("collections").OrderedDict()
     retriever._embedding_cache_lock = __import__("threading").Lock()
     retriever._embedding_cache_size = 256
     return retriever
@@ -298,6 +297,12 @@ class TestSQLValidation(unittest.TestCase):
         )
         self.assertEqual(rows[0]["error_code"], "sql_validation_failed")
 
+    def test_blocked_operation_detail_names_first_keyword_in_text(self):
+        result = self.retriever._validate_sql_query(
+            "select 1 from asrs_reports; update asrs_reports set title='x'; drop table asrs_reports"
+        )
+        self.assertEqual(result["detail"], "sql_contains_blocked_operation: UPDATE")
+
     def test_rejects_query_on_nonexistent_table(self):
         rows, _ = self.retriever.execute_sql_query(
             "SELECT * FROM nonexistent_table LIMIT 1"
@@ -481,6 +486,14 @@ class TestSchemaProvider(unittest.TestCase):
         count = int(version.split(":")[1])
         self.assertGreaterEqual(count, 1)
 
+    def test_snapshot_sql_schema_groups_columns_per_table(self):
+        snap = self.provider.snapshot()
+        tables = {t["table"]: t for t in snap["sql_schema"]["tables"]}
+        self.assertIn("asrs_reports", tables)
+        cols = [c["name"] for c in tables["asrs_reports"]["columns"]]
+        self.assertEqual(cols[:2], ["asrs_report_id", "event_date"])
+        self.assertEqual(len(cols), 10)
+
 
 # ====================================================================
 # 6. KQL Source Behavior
@@ -530,6 +543,10 @@ class TestKQLValidation(unittest.TestCase):
         result = self.retriever._validate_kql_query("delete from weather_obs where 1=1")
         self.assertIn("blocked_operation", result)
 
+    def test_blocked_operation_detail_names_first_keyword_case_insensitively(self):
+        result = self.retriever._validate_kql_query("weather_obs | where x == 1 | INGEST into t | DROP")
+        self.assertEqual(result, "kql_contains_blocked_operation:ingest")
+
     def test_rejects_multiple_statements(self):
         result = self.retriever._validate_kql_query("weather_obs | take 5; .drop table weather_obs")
         self.assertIsNotNone(result, "Multi-statement KQL with drop should be rejected")
@@ -846,6 +863,180 @@ class TestQueryRouterHeuristics(unittest.TestCase):
         self.assertEqual(route, "HYBRID")
 
 
+class TestQueryRouterCache(unittest.TestCase):
+    """Test the exact-match memo over LLM routing results."""
+
+    def setUp(self):
+        self.router = QueryRouter()
+        self.router.client = MagicMock()
+        response = MagicMock()
+        response.choices[0].message.content = json.dumps(
+            {"route": "SQL", "reasoning": "counts", "sources": ["sql", "bogus"]}
+        )
+        self.create = self.router.client.with_options.return_value.chat.completions.create
+        self.create.return_value = response
+
+    def test_repeat_query_is_served_from_cache(self):
+        first = self.router.route("How many ASRS reports?")
+        first["sources"].append("MUTATED")
+        second = self.router.route("  how many   asrs reports? ")
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(second["route"], "SQL")
+        self.assertEqual(second["sources"], ["SQL"])
+
+    def test_intent_graph_is_part_of_cache_key(self):
+        self.router.route("How many ASRS reports?")
+        self.router.route("How many ASRS reports?", intent_graph={"intents": ["x"]})
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_fallback_routes_are_not_cached(self):
+        self.create.side_effect = RuntimeError("boom")
+        self.router.route("How many ASRS reports?")
+        self.create.side_effect = None
+        result = self.router.route("How many ASRS reports?")
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(result["route"], "SQL")
+
+    def test_heuristic_fast_path_skips_llm_for_confident_queries(self):
+        with patch("query_router.ROUTING_HEURISTIC_FASTPATH", True):
+            confident = self.router.route("Top 5 locations by count of reports")
+            ambiguous = self.router.route("Top locations, and why?")
+        self.assertEqual(confident["route"], "SQL")
+        self.assertEqual(confident["reasoning"], "heuristic-high-confidence")
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(ambiguous["route"], "SQL")
+
+    def test_quick_route_scored_counts_distinct_keywords(self):
+        self.assertEqual(self.router.quick_route_scored("top top count"), ("SQL", 2))
+        self.assertEqual(self.router.quick_route_scored("top and why"), ("HYBRID", 0))
+
+    def test_sticky_deployment_follows_prompt_prefix(self):
+        self.router.deployments = ["route-a", "route-b"]
+        self.router.route("How many ASRS reports?", intent_graph={"intents": ["a"]})
+        self.router.route("Top 5 locations", intent_graph={"intents": ["b"]})
+        self.router.route("Count of reports by year", intent_graph={"intents": ["a"]})
+        models = [c.kwargs["model"] for c in self.create.call_args_list]
+        self.assertEqual(models, ["route-a", "route-b", "route-a"])
+
+    def test_streamed_route_stops_once_json_object_closes(self):
+        def _chunk(text):
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            return chunk
+
+        consumed = []
+
+        class _Stream:
+            closed = False
+
+            def __iter__(self):
+                for text in ['{"route": "SE', 'MANTIC", "sources": ["vector_reg"]}', "   ", "   "]:
+                    consumed.append(text)
+                    yield _chunk(text)
+
+            def close(self):
+                self.closed = True
+
+        stream = _Stream()
+        self.create.return_value = stream
+        with patch("query_router.ROUTING_STREAM", True):
+            result = self.router.route("Describe bird strikes")
+
+        self.assertEqual(result["route"], "SEMANTIC")
+        self.assertEqual(result["sources"], ["VECTOR_REG"])
+        self.assertEqual(len(consumed), 2)
+        self.assertTrue(stream.closed)
+        self.assertTrue(self.create.call_args.kwargs["stream"])
+
+    def test_route_output_is_capped_per_model_family(self):
+        self.router.deployments = ["gpt-4o-mini"]
+        self.router.route("How many ASRS reports?")
+        kwargs = self.create.call_args.kwargs
+        self.assertEqual(kwargs["max_tokens"], 400)
+        self.assertEqual(kwargs["temperature"], 0)
+
+        self.router.deployments = ["gpt-5-nano"]
+        self.router.route("Top 5 locations")
+        kwargs = self.create.call_args.kwargs
+        self.assertNotIn("max_tokens", kwargs)
+        self.assertEqual(kwargs["reasoning_effort"], "low")
+
+    def test_circuit_breaker_skips_llm_after_repeated_failures(self):
+        self.create.side_effect = RuntimeError("429")
+        with patch("query_router.ROUTING_BREAKER_FAIL_MAX", 2):
+            self.router._breakers.clear()
+            for query in ("q1", "q2", "q3", "q4"):
+                result = self.router.smart_route(query)
+                self.assertEqual(result["route"], "HYBRID")
+                self.assertIn("Heuristic fallback", result["reasoning"])
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_route_many_preserves_input_order(self):
+        def _respond(**kwargs):
+            query = kwargs["messages"][-1]["content"]
+            response = MagicMock()
+            response.choices[0].message.content = json.dumps({"route": query, "reasoning": "echo"})
+            return response
+
+        self.create.side_effect = _respond
+        results = self.router.route_many(["SQL", "SEMANTIC", "HYBRID"], concurrency=3)
+        self.assertEqual([r["route"] for r in results], ["SQL", "SEMANTIC", "HYBRID"])
+        self.assertEqual(self.router.route_many([]), [])
+
+    def test_semantic_cache_reuses_route_for_paraphrase(self):
+        vectors = {
+            "How many ASRS reports?": [1.0, 0.0, 0.0],
+            "Count of ASRS reports": [0.99, 0.05, 0.0],
+            "Describe bird strikes": [0.0, 1.0, 0.0],
+        }
+        with patch("query_router.ROUTING_SEMANTIC_CACHE", True):
+            router = QueryRouter(embed_fn=lambda q: vectors[q])
+        router.client = self.router.client
+
+        router.route("How many ASRS reports?")
+        paraphrase = router.route("Count of ASRS reports")
+        router.route("Describe bird strikes")
+
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(paraphrase["route"], "SQL")
+
+
+class TestSpeculativeSqlRouting(unittest.TestCase):
+    """SQL generation may start alongside LLM routing in answer()."""
+
+    def setUp(self):
+        self.retriever = _build_retriever()
+        self.retriever.pii_filter = None
+        self.retriever.speculative_sql_routing = True
+        self.retriever.router = MagicMock()
+        self.retriever.router.route.return_value = {"route": "SQL", "reasoning": "counts"}
+        self.retriever.query_sql = MagicMock(return_value=([{"n": 1}], "SELECT 1", []))
+        self.retriever._synthesize_answer = MagicMock(return_value="answer")
+
+    def test_sql_route_reuses_speculative_sql(self):
+        self.retriever.router.quick_route.return_value = "SQL"
+        result = self.retriever.answer("How many ASRS reports?")
+        self.retriever.query_sql.assert_called_once_with("How many ASRS reports?")
+        self.assertEqual(result.sql_query, "SELECT 1")
+
+    def test_router_sql_hint_discards_speculative_sql(self):
+        self.retriever.router.quick_route.return_value = "SQL"
+        self.retriever.router.route.return_value = {
+            "route": "SQL", "reasoning": "counts", "sql_hint": "group by year",
+        }
+        self.retriever.query_sql.side_effect = lambda q, hint=None: (
+            [{"n": 1}], f"SELECT 1 -- {hint}", []
+        )
+        result = self.retriever.answer("How many ASRS reports per year?")
+        self.retriever.query_sql.assert_called_with("How many ASRS reports per year?", "group by year")
+        self.assertEqual(result.sql_query, "SELECT 1 -- group by year")
+
+    def test_semantic_heuristic_skips_speculation(self):
+        self.retriever.router.quick_route.return_value = "SEMANTIC"
+        self.retriever.answer("Describe bird strikes")
+        self.retriever.query_sql.assert_called_once_with("Describe bird strikes", None)
+
+
 # ====================================================================
 # 12. Airport Extraction
 # ====================================================================
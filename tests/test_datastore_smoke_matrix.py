@@ -33,8 +33,7 @@ def _build_mock_retriever() -> UnifiedRetriever:
     retriever.sql_generator = _Writer()
     retriever.use_legacy_sql_generator = False
     retriever._cosmos_container = None
-    retriever._embedding_cache = {}
-    retriever._embedding_cache_order = []
+    retriever._embedding_cache = __import__("collections").OrderedDict()
     retriever._embedding_cache_lock = __import__("threading").Lock()
     retriever._embedding_cache_size = 256
     return retriever
@@ -0,0 +1,54 @@
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import shared_utils
+from af_streaming import to_sse
+from shared_utils import json_dumps, safe_preview_value
+
+
+EVENT = {
+    "type": "agent_update",
+    "content": "İstanbul — LTFM \"gate\" 5\n",
+    "rows": [{"n": 1, "ok": True, "score": 0.5, "none": None}],
+    2: "int key",
+}
+EXPECTED_SSE = (
+    'data: {"type":"agent_update","content":"İstanbul — LTFM \\"gate\\" 5\\n",'
+    '"rows":[{"n":1,"ok":true,"score":0.5,"none":null}],"2":"int key"}\n\n'
+)
+
+
+class JsonHelperTests(unittest.TestCase):
+    def _both_encoders(self):
+        yield "default"
+        with patch.object(shared_utils, "_orjson", None):
+            yield "stdlib"
+
+    def test_sse_frame_is_identical_with_and_without_orjson(self):
+        for encoder in self._both_encoders():
+            with self.subTest(encoder=encoder):
+                self.assertEqual(to_sse(EVENT), EXPECTED_SSE)
+
+    def test_preview_json_is_identical_with_and_without_orjson(self):
+        for encoder in self._both_encoders():
+            with self.subTest(encoder=encoder):
+                self.assertEqual(
+                    safe_preview_value({"route": "İST", "legs": [1, 2]}, 180),
+                    '{"route":"İST","legs":[1,2]}',
+                )
+
+    def test_datetimes_go_through_default_on_both_paths(self):
+        stamp = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        for encoder in self._both_encoders():
+            with self.subTest(encoder=encoder):
+                self.assertEqual(json_dumps({"t": stamp}, default=str), '{"t":"2026-01-02 03:04:05+00:00"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
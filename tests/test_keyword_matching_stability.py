@@ -5,7 +5,7 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
-from shared_utils import OPS_TABLE_SIGNALS, matches_any
+from shared_utils import OPS_TABLE_SIGNALS, matched_keyword_classes, matches_any
 from unified_retriever import _contains_tsql_parameter_placeholders
 
 
@@ -23,6 +23,15 @@ class KeywordMatchingStabilityTests(unittest.TestCase):
         self.assertTrue(matches_any("trace propagation chain", OPS_TABLE_SIGNALS))
         self.assertTrue(matches_any("dispatchable MEL item", OPS_TABLE_SIGNALS))
 
+    def test_matched_keyword_classes_reports_each_class_once(self):
+        classes = (("sql", frozenset({"sum", "how many"})), ("semantic", frozenset({"summarize"})))
+        self.assertEqual(matched_keyword_classes("Summarize the logs", classes), frozenset({"semantic"}))
+        self.assertEqual(
+            matched_keyword_classes("how many sum totals, then summarize", classes),
+            frozenset({"sql", "semantic"}),
+        )
+        self.assertEqual(matched_keyword_classes("dispatcher queue", classes), frozenset())
+
     def test_tsql_parameter_placeholder_detection(self):
         self.assertTrue(_contains_tsql_parameter_placeholders("SELECT * FROM t WHERE origin=@origin"))
         self.assertTrue(_contains_tsql_parameter_placeholders("SELECT * FROM t WHERE origin=@Origin"))
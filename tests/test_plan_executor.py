@@ -147,6 +147,53 @@ class PlanExecutorTests(unittest.TestCase):
         self.assertEqual(done_events[0].get("contract_status"), "met")
         self.assertEqual(done_events[0].get("execution_mode"), "live")
 
+    def test_execute_skips_success_previews_when_disabled(self):
+        retriever = _DummyRetriever()
+        executor = PlanExecutor(retriever, emit_previews=False)  # type: ignore[arg-type]
+        plan = AgenticPlan(
+            tool_calls=[ToolCall(id="call_1", tool="NOSQL", operation="lookup", query="doc one")]
+        )
+
+        result = executor.execute(user_query="test", plan=plan, schemas={})
+
+        done = [e for e in result.source_traces if e.get("type") == "source_call_done"][0]
+        self.assertEqual(done.get("row_count"), 1)
+        self.assertEqual(done.get("rows_preview"), [])
+        self.assertEqual(done.get("columns"), [])
+        self.assertFalse(done.get("rows_truncated"))
+
+    def test_execute_runs_dependencies_before_dependents(self):
+        retriever = _DummyRetriever()
+        executor = PlanExecutor(retriever)  # type: ignore[arg-type]
+        plan = AgenticPlan(
+            tool_calls=[
+                ToolCall(id="call_3", tool="NOSQL", operation="lookup", query="doc two", depends_on=["call_1", "call_2"]),
+                ToolCall(id="call_1", tool="NOSQL", operation="lookup", query="doc one"),
+                ToolCall(id="call_2", tool="NOSQL", operation="lookup", query="doc two", depends_on=["call_1"]),
+            ]
+        )
+
+        result = executor.execute(user_query="test", plan=plan, schemas={})
+
+        started = [e["event_id"] for e in result.source_traces if e.get("type") == "source_call_start"]
+        self.assertEqual(started, ["call_1", "call_2", "call_3"])
+        self.assertFalse(any("Dependency cycle" in warning for warning in result.warnings))
+
+    def test_execute_breaks_dependency_cycles(self):
+        retriever = _DummyRetriever()
+        executor = PlanExecutor(retriever)  # type: ignore[arg-type]
+        plan = AgenticPlan(
+            tool_calls=[
+                ToolCall(id="call_1", tool="NOSQL", operation="lookup", query="doc one", depends_on=["call_2"]),
+                ToolCall(id="call_2", tool="NOSQL", operation="lookup", query="doc two", depends_on=["call_1"]),
+            ]
+        )
+
+        result = executor.execute(user_query="test", plan=plan, schemas={})
+
+        self.assertEqual(set(result.source_results_by_call), {"call_1", "call_2"})
+        self.assertTrue(any("Dependency cycle" in warning for warning in result.warnings))
+
     def test_sql_need_schema_uses_heuristic_fallback(self):
         retriever = _DummyRetriever()
         executor = PlanExecutor(retriever)  # type: ignore[arg-type]
@@ -185,6 +232,32 @@ class PlanExecutorTests(unittest.TestCase):
         self.assertEqual(result.source_results["VECTOR_OPS"][0].get("id"), "vec1")
         self.assertTrue(any("shared_embedding_failed:" in warning for warning in result.warnings))
 
+    def test_vector_call_reuses_background_shared_embedding(self):
+        class _EmbeddingRetriever(_DummyRetriever):
+            def __init__(self):
+                self.seen_embeddings = []
+
+            def get_embedding(self, _query: str):
+                return [0.25, 0.5]
+
+            def query_semantic(self, _query: str, top: int = 5, embedding=None, source: str = "VECTOR_OPS", filter_expression=None):
+                self.seen_embeddings.append(embedding)
+                return [{"id": "vec1", "title": "sample"}], []
+
+        retriever = _EmbeddingRetriever()
+        executor = PlanExecutor(retriever)  # type: ignore[arg-type]
+        plan = AgenticPlan(
+            tool_calls=[
+                ToolCall(id="call_nosql", tool="NOSQL", operation="lookup", query="doc one"),
+                ToolCall(id="call_vec", tool="VECTOR_OPS", operation="lookup", query="runway risk"),
+            ]
+        )
+
+        result = executor.execute(user_query="runway risk", plan=plan, schemas={})
+
+        self.assertEqual(retriever.seen_embeddings, [[0.25, 0.5]])
+        self.assertFalse(any("shared_embedding_failed:" in warning for warning in result.warnings))
+
     def test_vector_call_with_non_string_query_coerces_to_user_query(self):
         retriever = _DummyRetriever()
         executor = PlanExecutor(retriever)  # type: ignore[arg-type]
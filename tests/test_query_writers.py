@@ -0,0 +1,40 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import query_writers
+from query_writers import _strip_fences, _writer_messages
+
+
+class QueryWriterPayloadTests(unittest.TestCase):
+    def test_writer_messages_put_schema_before_per_call_fields(self):
+        schema = {"tables": [{"table": "ops_flight_legs", "columns": ["leg_id", "origin_é"]}]}
+        fields = {"constraints": {}, "entities": {"airports": ["IST"]}, "user_query": "delays at IST ü"}
+
+        messages = _writer_messages("RULES", "sql_schema", schema, fields)
+
+        self.assertEqual([m["role"] for m in messages], ["system", "user", "user"])
+        self.assertEqual(messages[0]["content"], "RULES")
+        self.assertEqual(json.loads(messages[1]["content"]), {"sql_schema": schema})
+        per_call = json.loads(messages[2]["content"])
+        self.assertEqual(per_call, fields)
+        self.assertEqual(list(per_call)[-1], "user_query")
+
+    def test_schema_json_is_reused_for_the_same_snapshot(self):
+        schema = {"tables": []}
+        first = query_writers._schema_json(schema)
+        self.assertIs(query_writers._schema_json(schema), first)
+        self.assertEqual(json.loads(query_writers._schema_json({"tables": [1]})), {"tables": [1]})
+
+    def test_strip_fences_removes_language_tagged_fences(self):
+        self.assertEqual(_strip_fences("```SQL\nSELECT 1\n```"), "SELECT 1")
+        self.assertEqual(_strip_fences("  ```kql\nT | take 5```  "), "T | take 5")
+        self.assertEqual(_strip_fences("SELECT 2"), "SELECT 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
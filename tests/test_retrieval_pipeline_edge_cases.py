@@ -4,9 +4,11 @@ Tests malformed inputs, empty data, None values, deduplication, token budget
 extremes, conflict penalties, RRF edge cases, BFS termination, requery limits.
 """
 
+import os
 import sys
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
@@ -653,6 +655,98 @@ class TestGraphSchemaEdgeCases(unittest.TestCase):
         # Second call should use cache (call_count should be same as after first call)
         self.assertIs(snap1, snap2)
 
+    def test_static_schemas_are_independent_copies(self):
+        from schema_provider import SchemaProvider
+
+        class _Retriever:
+            def _now_iso(self):
+                return "2026-01-01T00:00:00Z"
+
+        provider = SchemaProvider(_Retriever())
+        with patch.dict(os.environ, {"KQL_SCHEMA_MODE": "static"}):
+            first_kql = provider._kql_schema()
+            first_kql["tables"][0]["columns"].append("mutated")
+            first_kql["tables"].clear()
+            second_kql = provider._kql_schema()
+        self.assertTrue(second_kql["tables"])
+        self.assertNotIn("mutated", second_kql["tables"][0]["columns"])
+
+        first_graph = provider._graph_schema()
+        first_graph["node_types"].clear()
+        self.assertIn("Airport", provider._graph_schema()["node_types"])
+
+    def test_parse_kql_show_schema_dedups_columns_in_order(self):
+        from schema_provider import SchemaProvider
+
+        provider = SchemaProvider.__new__(SchemaProvider)
+        parsed = provider._parse_kql_show_schema([
+            {"TableName": "b", "ColumnName": "x", "ColumnType": "long"},
+            {"TableName": "a", "ColumnName": "y"},
+            {"TableName": "b", "ColumnName": "w", "ColumnType": "string"},
+            {"TableName": "b", "ColumnName": "x", "ColumnType": "string"},
+        ])
+        self.assertEqual(
+            parsed["tables"],
+            [
+                {"table": "a", "columns": [{"name": "y", "type": "string"}]},
+                {"table": "b", "columns": [{"name": "x", "type": "long"}, {"name": "w", "type": "string"}]},
+            ],
+        )
+
+    def test_expired_snapshot_reuses_sql_schema_when_fingerprint_matches(self):
+        from schema_provider import SchemaProvider
+
+        class _FingerprintRetriever:
+            fingerprint = "v1"
+            sql_calls = 0
+
+            def _now_iso(self):
+                return "2026-01-01T00:00:00Z"
+
+            def sql_schema_fingerprint(self):
+                return self.fingerprint
+
+            def current_sql_schema(self):
+                self.sql_calls += 1
+                return {"tables": [], "schema_version": f"scan:{self.sql_calls}"}
+
+        retriever = _FingerprintRetriever()
+        provider = SchemaProvider(retriever)
+        provider.cache_ttl_seconds = 0
+        provider.snapshot()
+        provider.snapshot()
+        self.assertEqual(retriever.sql_calls, 1)
+
+        retriever.fingerprint = "v2"
+        snap = provider.snapshot()
+        self.assertEqual(retriever.sql_calls, 2)
+        self.assertEqual(snap["sql_schema"]["schema_version"], "scan:2")
+
+    def test_schema_snapshot_persists_across_provider_instances(self):
+        """A fresh provider should reuse the on-disk snapshot while it is within TTL."""
+        import tempfile
+        from unittest.mock import patch
+        import schema_provider
+        from schema_provider import SchemaProvider
+
+        class _SchemaRetriever:
+            sql_backend = "postgres"
+            sql_calls = 0
+
+            def _now_iso(self):
+                return "2026-01-01T00:00:00Z"
+
+            def current_sql_schema(self):
+                _SchemaRetriever.sql_calls += 1
+                return {"tables": [{"table": "ops_flight_legs", "columns": []}]}
+
+        with tempfile.TemporaryDirectory() as cache_dir, patch.object(schema_provider, "SCHEMA_CACHE_PATH", cache_dir):
+            first = SchemaProvider(_SchemaRetriever()).snapshot()
+            second = SchemaProvider(_SchemaRetriever()).snapshot()
+
+        self.assertEqual(_SchemaRetriever.sql_calls, 1)
+        self.assertEqual(first, second)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # Reconciliation Integration Edge Cases
@@ -5,7 +5,13 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
-from retrieval_plan import ExactPolicyValidationError, RetrievalRequest, build_retrieval_plan
+from retrieval_plan import (
+    ExactPolicyValidationError,
+    RetrievalRequest,
+    _plan_steps_cached,
+    _marker_hits,
+    build_retrieval_plan,
+)
 from shared_utils import validate_source_policy_request
 
 
@@ -90,6 +96,35 @@ class RetrievalPlanTests(unittest.TestCase):
         self.assertIn("SQL", sources)
         self.assertNotIn("FABRIC_SQL", sources)
 
+    def test_marker_scan_credits_markers_nested_in_longer_phrases(self):
+        hits = _marker_hits("ground handling doc for notam delays")
+        self.assertIn("nosql", hits)
+        self.assertIn("ops_table", hits)
+        self.assertIn("regulatory", hits)
+        self.assertIn("fabric_delay", hits)
+        self.assertNotIn("graph", hits)
+
+    def test_overlapping_markers_from_different_classes_both_match(self):
+        req = RetrievalRequest(query="which legs depends on time performance")
+        plan = build_retrieval_plan(req, route="HYBRID", route_reasoning="overlap")
+        sources = [s.source for s in plan.steps]
+        self.assertIn("GRAPH", sources)
+        self.assertIn("FABRIC_SQL", sources)
+
+    def test_plans_are_memoized_by_marker_classes_and_returned_as_copies(self):
+        req = RetrievalRequest(query="Live LTFM disruption impact in last 30 minutes")
+        first = build_retrieval_plan(req, route="HYBRID", route_reasoning="memo")
+        hits_before = _plan_steps_cached.cache_info().hits
+        second = build_retrieval_plan(
+            RetrievalRequest(query="Current status and impact at LTFM right now"),
+            route="HYBRID",
+            route_reasoning="memo",
+        )
+        self.assertEqual(_plan_steps_cached.cache_info().hits, hits_before + 1)
+        self.assertEqual(first.to_event_payload(), second.to_event_payload())
+        first.steps[0].params["mutated"] = True
+        self.assertNotIn("mutated", second.steps[0].params)
+
 
 if __name__ == "__main__":
     unittest.main()
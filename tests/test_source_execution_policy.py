@@ -2,6 +2,7 @@ import base64
 import json
 import os
 import sys
+import threading
 import time
 import unittest
 from pathlib import Path
@@ -779,6 +780,168 @@ class SourceExecutionPolicyTests(unittest.TestCase):
         )
         self.assertTrue(bool(kql_check.get("query_ready")))
 
+    def test_query_semantic_multi_searches_indexes_concurrently_and_merges_by_score(self):
+        retriever = self._build_retriever()
+        retriever.get_embedding = MagicMock(return_value=[0.1, 0.2])
+        threads = set()
+        scores = {"VECTOR_OPS": 0.4, "VECTOR_REG": 0.9, "VECTOR_AIRPORT": 0.6}
+
+        def _query_semantic(query, top, embedding, source, filter_expression):
+            threads.add(threading.get_ident())
+            time.sleep(0.02)
+            return [{"id": source, "__vector_score_final": scores[source]}], []
+
+        retriever.query_semantic = _query_semantic
+        rows, _citations = retriever.query_semantic_multi("runway incursion", sources=list(scores))
+
+        self.assertEqual([row["id"] for row in rows], ["VECTOR_REG", "VECTOR_AIRPORT", "VECTOR_OPS"])
+        self.assertGreater(len(threads), 1)
+        retriever.get_embedding.assert_called_once()
+
+    def test_post_json_reuses_pooled_client_and_maps_http_errors(self):
+        import httpx
+
+        retriever = self._build_retriever()
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            if request.url.path == "/bad":
+                return httpx.Response(503, text="busy")
+            return httpx.Response(200, json={"ok": True})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch.object(ur, "_fabric_http", client), \
+                patch.object(ur, "_acquire_fabric_token", return_value="tok"):
+            self.assertEqual(retriever._post_json("https://fabric.test/ok", {"q": 1}), {"ok": True})
+            self.assertEqual(
+                retriever._post_json("https://fabric.test/bad", {"q": 1}),
+                {"error": "http_503", "detail": "busy"},
+            )
+        self.assertEqual(seen[0].headers["Authorization"], "Bearer tok")
+        self.assertEqual(json.loads(seen[0].content), {"q": 1})
+
+    def test_embedding_cache_evicts_least_recently_used(self):
+        from collections import OrderedDict
+
+        retriever = self._build_retriever()
+        retriever._embedding_cache = OrderedDict()
+        retriever._embedding_cache_lock = threading.Lock()
+        retriever._embedding_cache_size = 2
+        retriever.embedding_deployment = "emb"
+        retriever.llm = MagicMock()
+        retriever.llm.embeddings.create.side_effect = lambda model, input: MagicMock(
+            data=[MagicMock(embedding=[float(len(input))])]
+        )
+
+        retriever.get_embedding("a")
+        retriever.get_embedding("bb")
+        retriever.get_embedding("a")
+        retriever.get_embedding("ccc")
+        self.assertEqual(list(retriever._embedding_cache), ["a", "ccc"])
+        self.assertEqual(retriever.get_embedding(" a "), [1.0])
+        self.assertEqual(retriever.llm.embeddings.create.call_count, 3)
+
+    def test_memoized_extractors_return_independent_lists(self):
+        retriever = self._build_retriever()
+        airports = retriever._extract_airports_from_query("Delays at KJFK and LTFM")
+        airports.append("XXXX")
+        self.assertEqual(retriever._extract_airports_from_query("Delays at KJFK and LTFM"), ["KJFK", "LTFM"])
+        tokens = retriever._query_tokens("runway closure KJFK")
+        tokens.clear()
+        self.assertIn("KJFK", retriever._query_tokens("runway closure KJFK"))
+
+    def test_execute_sql_query_uses_read_only_session_without_extra_statement(self):
+        retriever = self._build_retriever()
+        conn = retriever._pg_pool.getconn()
+        executed = []
+        cursor_factory = conn.cursor
+
+        def _cursor():
+            cur = cursor_factory()
+            original = cur.execute
+
+            def _execute(sql, *args, **kwargs):
+                executed.append(sql)
+                return original(sql, *args, **kwargs)
+
+            cur.execute = _execute
+            return cur
+
+        conn.cursor = _cursor
+        retriever._pg_pool.getconn = lambda: conn
+
+        rows, _citations = retriever.execute_sql_query("SELECT asrs_report_id, title FROM asrs_reports LIMIT 1")
+        self.assertIsNone(rows[0].get("error_code"))
+        self.assertTrue(conn.readonly)
+        self.assertFalse(conn.autocommit)
+        self.assertEqual(executed[-1], "SELECT asrs_report_id, title FROM asrs_reports LIMIT 1")
+        self.assertFalse(any("READ ONLY" in sql.upper() for sql in executed))
+
+        retriever._get_pg_connection()
+        self.assertIsNone(conn.readonly)
+        self.assertTrue(conn.autocommit)
+
+    def test_fabric_preflight_reuses_recent_report_until_refresh(self):
+        retriever = self._build_retriever()
+        retriever._run_fabric_preflight = MagicMock(side_effect=[{"run": 1}, {"run": 2}])
+
+        with patch.object(ur, "FABRIC_PREFLIGHT_CACHE_SECONDS", 30.0):
+            self.assertEqual(retriever.fabric_preflight(), {"run": 1})
+            self.assertEqual(retriever.fabric_preflight(), {"run": 1})
+            self.assertEqual(retriever.fabric_preflight(refresh=True), {"run": 2})
+        self.assertEqual(retriever._run_fabric_preflight.call_count, 2)
+
+    def test_warm_caches_primes_sql_schema_and_swallows_failures(self):
+        retriever = self._build_retriever()
+        retriever.cached_sql_schema = MagicMock(return_value={"tables": []})
+        retriever._warm_caches()
+        retriever.cached_sql_schema.assert_called_once()
+
+        retriever.cached_sql_schema = MagicMock(side_effect=RuntimeError("pg down"))
+        retriever._warm_caches()
+
+    def test_answer_cache_serves_repeats_within_ttl(self):
+        retriever = self._build_retriever()
+        retriever.pii_filter = None
+        retriever.speculative_sql_routing = False
+        retriever.router = MagicMock()
+        retriever.router.route.return_value = {"route": "SEMANTIC", "reasoning": "docs"}
+        retriever.execute_semantic_route = MagicMock(
+            side_effect=lambda q: ur.RetrievalResult(answer=f"answer:{q}", route="SEMANTIC", reasoning="")
+        )
+        ur._answer_cache.clear()
+        self.addCleanup(ur._answer_cache.clear)
+
+        with patch.object(ur, "ANSWER_CACHE_TTL_SECONDS", 60.0):
+            first = retriever.answer("bird strikes at  LTFM")
+            first.answer = "mutated"
+            second = retriever.answer(" bird strikes at LTFM")
+        self.assertEqual(second.answer, "answer:bird strikes at  LTFM")
+        retriever.router.route.assert_called_once()
+
+        with patch.object(ur, "ANSWER_CACHE_TTL_SECONDS", 0.0):
+            retriever.answer("bird strikes at LTFM")
+        self.assertEqual(retriever.router.route.call_count, 2)
+
+    def test_schema_cache_skips_errors_and_can_be_invalidated(self):
+        retriever = self._build_retriever()
+        retriever._schema_cache = None
+        retriever._schema_cache_expires_at = 0.0
+        retriever._schema_cache_ttl = 300.0
+        retriever.current_sql_schema = MagicMock(side_effect=[
+            {"tables": [], "error": "pg down"},
+            {"tables": [{"table": "asrs_reports"}]},
+            {"tables": [{"table": "asrs_reports"}, {"table": "crew"}]},
+        ])
+
+        self.assertEqual(retriever.cached_sql_schema().get("error"), "pg down")
+        self.assertEqual(len(retriever.cached_sql_schema()["tables"]), 1)
+        self.assertEqual(len(retriever.cached_sql_schema()["tables"]), 1)
+        retriever.invalidate_schema_cache()
+        self.assertEqual(len(retriever.cached_sql_schema()["tables"]), 2)
+        self.assertEqual(retriever.current_sql_schema.call_count, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
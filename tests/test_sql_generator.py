@@ -0,0 +1,207 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import sql_generator
+from sql_generator import SYSTEM_PROMPT, SQLGenerator
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class SQLGeneratorTests(unittest.TestCase):
+    def setUp(self):
+        sql_generator._sql_cache.clear()
+        self.generator = object.__new__(SQLGenerator)
+        self.generator.client = MagicMock()
+        self.generator.model = "test-model"
+        self.generator._create_kwargs = {}
+        self.generator._embed_fn = None
+        self.generator._semantic_cache = None
+        self.create = self.generator.client.chat.completions.create
+        self.create.return_value = _completion("```sql\nSELECT 1\n```")
+
+    def tearDown(self):
+        sql_generator._sql_cache.clear()
+
+    def test_generate_strips_fences(self):
+        self.assertEqual(self.generator.generate("count reports"), "SELECT 1")
+
+    def test_requests_share_the_system_message(self):
+        self.generator.generate("count reports")
+        self.generator.generate_with_context("list reports", context="schema A")
+        first, second = (c.kwargs["messages"][0] for c in self.create.call_args_list)
+        self.assertIs(first, second)
+        self.assertEqual(first, {"role": "system", "content": SYSTEM_PROMPT})
+
+    def test_repeated_question_is_served_from_cache(self):
+        self.generator.generate("count  reports at LTFM")
+        self.assertEqual(self.generator.generate("count reports at LTFM "), "SELECT 1")
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_context_is_part_of_the_cache_key(self):
+        self.generator.generate_with_context("count reports", context="schema A")
+        self.generator.generate_with_context("count reports", context="schema B")
+        self.assertEqual(self.create.call_count, 2)
+        messages = self.create.call_args.kwargs["messages"]
+        self.assertEqual(
+            [m["content"] for m in messages[1:]],
+            ["Additional context: schema B", "count reports"],
+        )
+
+    def test_semantic_cache_serves_paraphrases(self):
+        from semantic_cache import SemanticCache
+
+        vectors = {
+            "top 10 flight phases": [1.0, 0.0],
+            "the 10 most common flight phases": [0.999, 0.01],
+            "crew duty by base": [0.0, 1.0],
+        }
+        self.generator._embed_fn = vectors.__getitem__
+        self.generator._semantic_cache = SemanticCache(8, 0.97)
+
+        self.generator.generate("top 10 flight phases")
+        self.assertEqual(self.generator.generate("the 10 most common flight phases"), "SELECT 1")
+        self.assertEqual(self.create.call_count, 1)
+        self.generator.generate("crew duty by base")
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_semantic_cache_requires_matching_literals(self):
+        from semantic_cache import SemanticCache
+
+        vectors = {
+            "delayed legs at LTFM yesterday": [1.0, 0.0],
+            "delayed legs at LTBA yesterday": [0.999, 0.01],
+            "delayed legs at LTFM yesterday?": [0.999, 0.01],
+            "delayed legs at jfk yesterday": [0.999, 0.01],
+        }
+        self.generator._embed_fn = vectors.__getitem__
+        self.generator._semantic_cache = SemanticCache(8, 0.97)
+
+        self.generator.generate("delayed legs at LTFM yesterday")
+        self.generator.generate("delayed legs at LTBA yesterday")
+        self.assertEqual(self.create.call_count, 2)
+        self.generator.generate("delayed legs at LTFM yesterday?")
+        self.assertEqual(self.create.call_count, 2)
+        self.generator.generate("delayed legs at jfk yesterday")
+        self.assertEqual(self.create.call_count, 3)
+
+    def test_generate_many_preserves_input_order(self):
+        self.create.side_effect = lambda **kw: _completion(f"SELECT '{kw['messages'][-1]['content']}'")
+        queries = ["a", "b", "c", "d"]
+        self.assertEqual(
+            self.generator.generate_many(queries, concurrency=3),
+            ["SELECT 'a'", "SELECT 'b'", "SELECT 'c'", "SELECT 'd'"],
+        )
+
+    def test_generate_stream_stops_after_terminated_statement(self):
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(
+            [_chunk("```sql\nSELECT "), _chunk("1;"), _chunk("\n"), _chunk("```\nThis query counts")]
+        )
+        self.create.return_value = stream
+
+        parts = list(self.generator.generate_stream("count reports"))
+
+        self.assertEqual("".join(parts), "```sql\nSELECT 1;\n")
+        self.assertTrue(self.create.call_args.kwargs["stream"])
+        stream.close.assert_called_once()
+
+    @patch.object(sql_generator, "SQL_GENERATOR_HEDGE_MS", 20)
+    def test_slow_request_is_hedged_and_fastest_response_wins(self):
+        release = threading.Event()
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                release.wait(5)
+                return _completion("SELECT 'slow'")
+            return _completion("SELECT 'fast'")
+
+        self.create.side_effect = create
+        try:
+            self.assertEqual(self.generator.generate("count reports"), "SELECT 'fast'")
+        finally:
+            release.set()
+        self.assertEqual(len(calls), 2)
+
+    @patch.object(sql_generator, "SQL_GENERATOR_HEDGE_MS", 1000)
+    def test_fast_request_is_not_hedged(self):
+        self.assertEqual(self.generator.generate("count reports"), "SELECT 1")
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_concurrency_gate_caps_in_flight_requests(self):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def create(**kwargs):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            threading.Event().wait(0.02)
+            with lock:
+                state["active"] -= 1
+            return _completion("SELECT 1")
+
+        self.create.side_effect = create
+        with patch.object(sql_generator, "_concurrency_slots", threading.BoundedSemaphore(2)):
+            self.generator.generate_many([f"q{i}" for i in range(6)], concurrency=6)
+        self.assertEqual(self.create.call_count, 6)
+        self.assertLessEqual(state["peak"], 2)
+
+    def test_rate_limiter_waits_for_tokens_after_burst(self):
+        clock = {"now": 100.0}
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock["now"] += seconds
+
+        with patch.object(sql_generator.time, "monotonic", lambda: clock["now"]), \
+                patch.object(sql_generator.time, "sleep", sleep):
+            limiter = sql_generator._RateLimiter(60)
+            for _ in range(6):
+                limiter.acquire()
+            self.assertEqual(sleeps, [])
+            limiter.acquire()
+        self.assertEqual(len(sleeps), 1)
+        self.assertAlmostEqual(sleeps[0], 1.0)
+
+    @patch.object(sql_generator, "SQL_GENERATOR_TEMPLATES", True)
+    def test_fixed_shape_questions_skip_the_llm(self):
+        self.assertEqual(
+            self.generator.generate("Top 5 flight phases?"),
+            "SELECT flight_phase, COUNT(*) AS report_count FROM asrs_reports "
+            "WHERE flight_phase IS NOT NULL GROUP BY flight_phase "
+            "ORDER BY report_count DESC LIMIT 5",
+        )
+        self.assertIn(
+            "LIKE LOWER('%bird strike%')",
+            self.generator.generate("reports mentioning  bird strike"),
+        )
+        self.create.assert_not_called()
+
+    @patch.object(sql_generator, "SQL_GENERATOR_TEMPLATES", True)
+    def test_questions_with_extra_filters_fall_through_to_the_llm(self):
+        self.generator.generate("top 5 flight phases in 2019 at LTFM")
+        self.generator.generate("reports mentioning o'hare'; drop table x")
+        self.generator.generate("reports about bird strikes in 2019")
+        self.generator.generate("show reports mentioning go-around at LTFM")
+        self.generator.generate("reports about icing since")
+        self.assertEqual(self.create.call_count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()